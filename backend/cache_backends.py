@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple
+
+from backend.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# -- общий (L2) кэш для всех воркеров на хосте: sqlite:///путь, redis://хост:порт/0 или пусто
+TMDB_L2_CACHE = os.getenv("TMDB_L2_CACHE", "")
+DEFAULT_L2_SQLITE_PATH = os.path.join(tempfile.gettempdir(), "watch_tmdb_l2.sqlite3")
+
+# -- (тело ответа, expires_at, stale_until); время — wall clock, общее для процессов
+L2Entry = Tuple[bytes, float, float]
+
+
+class CacheBackend:
+    """Интерфейс общего кэша: хранит сырые тела ответов TMDB со сроками жизни"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[L2Entry]:
+        try:
+            entry = await self._get(key)
+        except Exception as e:
+            self.errors += 1
+            CACHE_LOOKUPS.labels("l2", "error").inc()
+            logger.warning("L2 cache get failed for %s: %s", key, e)
+            return None
+        if entry is None or time.time() >= entry[2]:
+            self.misses += 1
+            CACHE_LOOKUPS.labels("l2", "miss").inc()
+            return None
+        self.hits += 1
+        CACHE_LOOKUPS.labels("l2", "hit" if time.time() < entry[1] else "stale").inc()
+        return entry
+
+    async def set(self, key: str, body: bytes, ttl: int, stale_seconds: int):
+        now = time.time()
+        try:
+            await self._set(key, body, now + ttl, now + ttl + stale_seconds)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("L2 cache set failed for %s: %s", key, e)
+
+    async def aclose(self):
+        pass
+
+    async def _get(self, key: str) -> Optional[L2Entry]:
+        raise NotImplementedError
+
+    async def _set(self, key: str, body: bytes, expires_at: float, stale_until: float):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """L2-кэш в файле SQLite в режиме WAL: читать и писать могут все воркеры хоста"""
+
+    PURGE_EVERY = 256
+
+    def __init__(self, path: str = DEFAULT_L2_SQLITE_PATH):
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # -- соединение открывается лениво, чтобы бэкенд переживал перезапуск lifespan
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tmdb_cache ("
+                "key TEXT PRIMARY KEY, body BLOB NOT NULL, expires_at REAL NOT NULL, stale_until REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _get_sync(self, key: str):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT body, expires_at, stale_until FROM tmdb_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return (bytes(row[0]), row[1], row[2]) if row else None
+
+    def _set_sync(self, key: str, body: bytes, expires_at: float, stale_until: float):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO tmdb_cache (key, body, expires_at, stale_until) VALUES (?, ?, ?, ?)",
+                (key, body, expires_at, stale_until),
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM tmdb_cache WHERE stale_until < ?", (time.time(),))
+
+    async def _get(self, key: str):
+        return await asyncio.to_thread(self._get_sync, key)
+
+    async def _set(self, key: str, body: bytes, expires_at: float, stale_until: float):
+        await asyncio.to_thread(self._set_sync, key, body, expires_at, stale_until)
+
+    async def aclose(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RedisCacheBackend(CacheBackend):
+    """L2-кэш поверх Redis (или любого сервера с Redis-протоколом).
+
+    client — объект с асинхронными get/set в стиле redis.asyncio; в тестах его
+    можно заменить локальной заглушкой.
+    """
+
+    PREFIX = "watch:tmdb:"
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCacheBackend":
+        import redis.asyncio as redis
+
+        return cls(redis.from_url(url))
+
+    async def _get(self, key: str):
+        raw = await self.client.get(self.PREFIX + key)
+        if raw is None:
+            return None
+        header, _, body = bytes(raw).partition(b"\n")
+        expires_at, stale_until = (float(x) for x in header.split(b" "))
+        return body, expires_at, stale_until
+
+    async def _set(self, key: str, body: bytes, expires_at: float, stale_until: float):
+        header = f"{expires_at} {stale_until}\n".encode()
+        # -- Redis сам удалит запись после окончания окна stale
+        ttl = max(1, int(stale_until - time.time()))
+        await self.client.set(self.PREFIX + key, header + body, ex=ttl)
+
+    async def aclose(self):
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+
+def build_backend(url: str = TMDB_L2_CACHE) -> Optional[CacheBackend]:
+    """Создать L2-бэкенд по URL из TMDB_L2_CACHE; пустая строка — L2 выключен"""
+    if not url:
+        return None
+    if url.startswith("sqlite://"):
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else ""
+        return SQLiteCacheBackend(path or DEFAULT_L2_SQLITE_PATH)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend.from_url(url)
+    raise ValueError(f"Unsupported TMDB_L2_CACHE backend: {url}")
@@ -0,0 +1,231 @@
+"""
+Фоновый прогрев кэша TMDB: популярные страницы, топ-жанры и самые просматриваемые фильмы.
+
+После старта воркера цели запрашиваются сразу, а затем обновляются заранее — на доле
+CACHE_WARMER_REFRESH_FRACTION от TTL со случайным разбросом, чтобы обновления не шли пачкой.
+Самые просматриваемые фильмы берутся из watch_history и favorites и пересчитываются раз в
+CACHE_WARMER_PLAN_INTERVAL секунд.
+
+Прогревом занимается один воркер — тот, кто взял файловую блокировку CACHE_WARMER_LOCK;
+остальные раз в CACHE_WARMER_LOCK_RETRY_SECONDS пытаются её перехватить (если тот воркер завершился). Ответы попадают
+в общий L2-кэш (TMDB_L2_CACHE), поэтому остальные воркеры тоже получают их без запросов к TMDB.
+"""
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import func, select, union_all
+
+from backend import models
+from backend.metrics import CACHE_WARMER_REFRESHES
+from backend.response_cache import ENDPOINT_TTLS
+
+logger = logging.getLogger(__name__)
+
+CACHE_WARMER_ENABLED = str(os.getenv("CACHE_WARMER_ENABLED", "false")).lower() in ("1", "true", "yes")
+CACHE_WARMER_POPULAR_PAGES = int(os.getenv("CACHE_WARMER_POPULAR_PAGES", "5"))
+# -- жанры TMDB: боевик, приключения, мультфильм, комедия, драма
+CACHE_WARMER_GENRES = [int(g) for g in os.getenv("CACHE_WARMER_GENRES", "28,12,16,35,18").split(",") if g.strip()]
+CACHE_WARMER_GENRE_PAGES = int(os.getenv("CACHE_WARMER_GENRE_PAGES", "1"))
+CACHE_WARMER_TOP_MOVIES = int(os.getenv("CACHE_WARMER_TOP_MOVIES", "50"))
+CACHE_WARMER_CONCURRENCY = int(os.getenv("CACHE_WARMER_CONCURRENCY", "4"))
+CACHE_WARMER_REFRESH_FRACTION = float(os.getenv("CACHE_WARMER_REFRESH_FRACTION", "0.8"))
+CACHE_WARMER_JITTER = float(os.getenv("CACHE_WARMER_JITTER", "0.1"))
+CACHE_WARMER_PLAN_INTERVAL = float(os.getenv("CACHE_WARMER_PLAN_INTERVAL", "600"))
+CACHE_WARMER_RETRY_SECONDS = float(os.getenv("CACHE_WARMER_RETRY_SECONDS", "60"))
+CACHE_WARMER_LOCK_RETRY_SECONDS = float(os.getenv("CACHE_WARMER_LOCK_RETRY_SECONDS", "15"))
+CACHE_WARMER_LOCK = os.getenv("CACHE_WARMER_LOCK", os.path.join(tempfile.gettempdir(), "watch_cache_warmer.lock"))
+
+
+@dataclass(frozen=True)
+class WarmTarget:
+    endpoint: str
+    path: str
+    params: Tuple[Tuple[str, object], ...] = ()
+
+
+class WarmerLock:
+    """Неблокирующая файловая блокировка: держит её один процесс, ОС снимает её при завершении процесса"""
+
+    def __init__(self, path: str = CACHE_WARMER_LOCK):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        f = open(self.path, "a+")
+        try:
+            _lock_file(f)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            try:
+                _unlock_file(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+
+
+try:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+except ImportError:  # pragma: no cover - Windows
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+async def most_viewed_movies(session_factory, limit: int) -> List[int]:
+    """id фильмов, чаще всего встречающихся в истории просмотров и избранном"""
+    views = union_all(
+        select(models.WatchHistory.movie_id.label("movie_id")),
+        select(models.Favorite.movie_id.label("movie_id")),
+    ).subquery()
+    query = select(views.c.movie_id).group_by(views.c.movie_id).order_by(func.count().desc()).limit(limit)
+    async with session_factory() as db:
+        return list((await db.scalars(query)).all())
+
+
+class CacheWarmer:
+    """Планировщик прогрева: обновляет цели заранее, не больше concurrency запросов к TMDB одновременно"""
+
+    def __init__(
+            self,
+            tmdb,
+            session_factory,
+            lock: Optional[WarmerLock] = None,
+            popular_pages: int = CACHE_WARMER_POPULAR_PAGES,
+            genres: Optional[List[int]] = None,
+            genre_pages: int = CACHE_WARMER_GENRE_PAGES,
+            top_movies: int = CACHE_WARMER_TOP_MOVIES,
+            concurrency: int = CACHE_WARMER_CONCURRENCY,
+            refresh_fraction: float = CACHE_WARMER_REFRESH_FRACTION,
+            jitter: float = CACHE_WARMER_JITTER,
+            plan_interval: float = CACHE_WARMER_PLAN_INTERVAL,
+            retry_seconds: float = CACHE_WARMER_RETRY_SECONDS,
+            lock_retry_seconds: float = CACHE_WARMER_LOCK_RETRY_SECONDS,
+            clock=time.monotonic,
+            rng: Optional[random.Random] = None,
+    ):
+        self.tmdb = tmdb
+        self.session_factory = session_factory
+        self.lock = lock or WarmerLock()
+        self.popular_pages = popular_pages
+        self.genres = CACHE_WARMER_GENRES if genres is None else genres
+        self.genre_pages = genre_pages
+        self.top_movies = top_movies
+        self.limiter = asyncio.Semaphore(concurrency)
+        self.refresh_fraction = refresh_fraction
+        self.jitter = jitter
+        self.plan_interval = plan_interval
+        self.retry_seconds = retry_seconds
+        self.lock_retry_seconds = lock_retry_seconds
+        self.clock = clock
+        self.rng = rng or random.Random()
+        # -- когда обновлять каждую цель (по clock)
+        self.due: Dict[WarmTarget, float] = {}
+        self.refreshed = 0
+        self.failed = 0
+
+    async def plan(self) -> List[WarmTarget]:
+        """Цели прогрева; параметры совпадают с маршрутами main, иначе не совпадут ключи кэша"""
+        targets = [WarmTarget("popular", "/movie/popular", (("page", page),))
+                   for page in range(1, self.popular_pages + 1)]
+        targets += [
+            WarmTarget("genre", "/discover/movie",
+                       (("page", page), ("with_genres", genre), ("sort_by", "popularity.desc")))
+            for genre in self.genres for page in range(1, self.genre_pages + 1)
+        ]
+        if self.top_movies > 0:
+            movie_ids = await most_viewed_movies(self.session_factory, self.top_movies)
+            targets += [WarmTarget("details", f"/movie/{movie_id}") for movie_id in movie_ids]
+        return targets
+
+    def _replan(self, targets: List[WarmTarget]):
+        now = self.clock()
+        # -- новые цели — сразу, выбывшие (фильм больше не в топе) — больше не обновляем
+        self.due = {target: self.due.get(target, now) for target in targets}
+
+    def _next_due(self, seconds: float) -> float:
+        return self.clock() + seconds * (1 + self.rng.uniform(-self.jitter, self.jitter))
+
+    async def refresh(self, target: WarmTarget):
+        async with self.limiter:
+            try:
+                await self.tmdb.refresh(target.endpoint, target.path, dict(target.params))
+            except httpx.HTTPError as e:
+                logger.warning("Cache warmer failed to refresh %s: %s", target.path, e)
+                self._failed(target)
+                return
+            except Exception:
+                # -- например, сбой записи в L2 (SQLite / Redis): цель повторим позже, цикл прогрева не прерываем
+                logger.exception("Cache warmer failed to refresh %s", target.path)
+                self._failed(target)
+                return
+        CACHE_WARMER_REFRESHES.labels(target.endpoint, "ok").inc()
+        self.refreshed += 1
+        self.due[target] = self._next_due(ENDPOINT_TTLS[target.endpoint] * self.refresh_fraction)
+
+    def _failed(self, target: WarmTarget):
+        CACHE_WARMER_REFRESHES.labels(target.endpoint, "error").inc()
+        self.failed += 1
+        self.due[target] = self._next_due(self.retry_seconds)
+
+    async def run_once(self):
+        """Обновить все цели, срок которых подошёл"""
+        now = self.clock()
+        await asyncio.gather(*[self.refresh(target) for target, due in list(self.due.items()) if due <= now])
+
+    async def run(self):
+        planned_at = None
+        try:
+            while True:
+                if not self.lock.acquire():
+                    await asyncio.sleep(self.lock_retry_seconds)
+                    continue
+                if planned_at is None or self.clock() - planned_at >= self.plan_interval:
+                    try:
+                        self._replan(await self.plan())
+                    except Exception:
+                        logger.exception("Cache warmer failed to plan targets")
+                    planned_at = self.clock()
+                await self.run_once()
+                wake = min(self.due.values(), default=planned_at + self.plan_interval)
+                wake = min(wake, planned_at + self.plan_interval)
+                await asyncio.sleep(max(1.0, wake - self.clock()))
+        finally:
+            self.lock.release()
+
+
+def start(tmdb, session_factory) -> Optional[asyncio.Task]:
+    """Запустить прогрев в фоне (из lifespan), если он включён"""
+    if not CACHE_WARMER_ENABLED:
+        return None
+    return asyncio.create_task(CacheWarmer(tmdb, session_factory).run())
@@ -0,0 +1,135 @@
+"""
+Сжатие ответов API (gzip / brotli) с выбором по Accept-Encoding.
+
+Ответы TMDB сжимаются один раз — когда попадают в кэш (Payload.precompress), и дальше
+отдаются готовыми вариантами. Остальные ответы больше COMPRESS_MIN_SIZE сжимает на лету
+CompressionMiddleware, быстрыми уровнями.
+"""
+import gzip
+import os
+from typing import Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli есть в requirements, но это необязательная зависимость
+    brotli = None
+
+# -- ответы меньше порога не сжимаются: выигрыш в байтах не окупает CPU и заголовки
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+# -- уровни для сжатия при сохранении в кэш (один раз на запись) и на лету (на каждый ответ)
+COMPRESS_STORE_GZIP_LEVEL = int(os.getenv("COMPRESS_STORE_GZIP_LEVEL", "9"))
+COMPRESS_STORE_BROTLI_QUALITY = int(os.getenv("COMPRESS_STORE_BROTLI_QUALITY", "9"))
+COMPRESS_DYNAMIC_GZIP_LEVEL = int(os.getenv("COMPRESS_DYNAMIC_GZIP_LEVEL", "5"))
+COMPRESS_DYNAMIC_BROTLI_QUALITY = int(os.getenv("COMPRESS_DYNAMIC_BROTLI_QUALITY", "4"))
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """ETag сжатого варианта: "abc" -> "abc-br"; при сравнении суффикс отбрасывается (http_cache)"""
+    if not encoding or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def compress(body: bytes, encoding: str, stored: bool = False) -> bytes:
+    if encoding == "br":
+        quality = COMPRESS_STORE_BROTLI_QUALITY if stored else COMPRESS_DYNAMIC_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = COMPRESS_STORE_GZIP_LEVEL if stored else COMPRESS_DYNAMIC_GZIP_LEVEL
+    # -- mtime=0: одинаковое тело — одинаковые байты (и стабильный ETag варианта)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def negotiate(accept_encoding: Optional[str], available: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """Лучшее доступное сжатие по Accept-Encoding (с учётом q); None — отдавать как есть"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    # -- порядок available — предпочтение сервера при равных q (brotli плотнее gzip)
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """ASGI-middleware: сжимает на лету ответы без Content-Encoding больше min_size"""
+
+    def __init__(self, app, min_size: int = COMPRESS_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # -- заголовки придержим, пока не станет ясно, сжимать ли тело
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+            response_start, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._wanted(response_start, body):
+                await send(response_start)
+                await send(message)
+                return
+            compressed = compress(body, encoding)
+            headers = []
+            for name, value in response_start["headers"]:
+                if name == b"content-length":
+                    continue
+                if name == b"etag":
+                    # -- сжатый ответ — другое представление, у него свой ETag
+                    value = variant_etag(value.decode("latin-1"), encoding).encode("latin-1")
+                headers.append((name, value))
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**response_start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _wanted(self, start, body: bytes) -> bool:
+        if len(body) < self.min_size or start["status"] < 200 or start["status"] in (204, 304):
+            return False
+        content_type = b""
+        for name, value in start["headers"]:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.startswith(COMPRESSIBLE_TYPES)
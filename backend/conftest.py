@@ -10,8 +10,9 @@ os.environ["TMDB_API_KEY"] = "test-tmdb-key"
 # os.environ["USE_TMDB_CACHE"] = "1"
 
 from backend import models
-from backend.database import engine
+from backend.database import engine, AsyncSessionLocal
 from backend.main import get_db, app
+from backend.sql_instrumentation import assert_max_queries as _assert_max_queries, track_queries
 
 
 TestingSessionLocal = sessionmaker(
@@ -35,7 +36,7 @@ def prepare_database():
 @pytest.fixture
 def db_session():
     """
-    Отдельная сессия БД на каждый тест.
+    Отдельная синхронная сессия БД на каждый тест (для проверок в самих тестах).
     """
     session = TestingSessionLocal()
     try:
@@ -47,15 +48,29 @@ def db_session():
 @pytest.fixture
 def client(db_session):
     """
-    TestClient FastAPI с переопределённым get_db, чтобы всё шло в SQLite.
+    TestClient FastAPI с переопределённым get_db, чтобы всё шло в SQLite (через aiosqlite).
     """
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    async def override_get_db():
+        async with AsyncSessionLocal() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def assert_max_queries():
+    """
+    Контекстный менеджер: with assert_max_queries(2): client.get(...) — падает, если запросов к БД больше.
+    """
+    return _assert_max_queries
+
+
+@pytest.fixture
+def query_tracker():
+    """
+    Контекстный менеджер track_queries(): число и SQL запросов к БД внутри блока.
+    """
+    return track_queries
@@ -0,0 +1,115 @@
+import logging
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# -- размер пула на воркер: при 4 воркерах в Postgres уходит до 4 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) соединений
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# -- пересоздавать соединения старше N секунд (-1 — никогда); нужно за PgBouncer и балансировщиками
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = str(os.getenv("DB_POOL_PRE_PING", "false")).lower() in ("1", "true", "yes")
+# -- ожидание соединения дольше этого порога считается медленным
+DB_POOL_SLOW_CHECKOUT = float(os.getenv("DB_POOL_SLOW_CHECKOUT", "0.1"))
+
+
+class PoolTelemetry:
+    """Счётчики пула соединений: ожидание checkout, занятые соединения, overflow и таймауты"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.checkins = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, overflowed: bool = False, timed_out: bool = False):
+        self.waits += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        if seconds >= DB_POOL_SLOW_CHECKOUT:
+            self.slow_checkouts += 1
+        if overflowed:
+            self.overflow_events += 1
+        if timed_out:
+            self.timeouts += 1
+            logger.warning("DB pool %s: checkout timed out after %.3fs", self.name, seconds)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        self.checked_out += 1
+        self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+        self.checked_out = max(0, self.checked_out - 1)
+
+    def attach(self, engine):
+        """Подписаться на события пула движка (переживают engine.dispose())"""
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def stats(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "checked_out": self.checked_out,
+            "max_checked_out": self.max_checked_out,
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+            "slow_checkouts": self.slow_checkouts,
+            "wait_seconds_avg": round(self.wait_seconds_total / self.waits, 6) if self.waits else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+def instrumented_pool(base, telemetry: PoolTelemetry):
+    """Подкласс пула, который замеряет время ожидания свободного соединения.
+
+    Событий «до checkout» у SQLAlchemy нет, поэтому ожидание меряется вокруг _do_get;
+    telemetry хранится в классе, чтобы пережить pool.recreate() при dispose.
+    """
+
+    def _do_get(self):
+        before = self.overflow()
+        started = time.perf_counter()
+        try:
+            record = base._do_get(self)
+        except PoolTimeoutError:
+            telemetry.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        after = self.overflow()
+        telemetry.record_wait(time.perf_counter() - started, overflowed=after > 0 and after > before)
+        return record
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def pool_options(url: str, telemetry: PoolTelemetry, is_async: bool = False) -> dict:
+    """Параметры create_engine для пула из переменных окружения.
+
+    Для SQLite SQLAlchemy выбирает свой пул (NullPool / SingletonThreadPool) — его не трогаем,
+    размеры пула имеют смысл только для серверных БД.
+    """
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if url.startswith("sqlite"):
+        return options
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    options.update(
+        poolclass=instrumented_pool(base, telemetry),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return options
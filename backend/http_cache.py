@@ -0,0 +1,92 @@
+"""
+Условное HTTP-кэширование ответов API: ETag / Last-Modified, 304 и Cache-Control.
+
+ETag ответов TMDB считается один раз при сохранении тела в кэш (Payload.etag),
+ETag отзывов и оценок — из счётчика версии фильма в movie_rating_stats.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Response
+
+# -- max-age (в секундах) по маршрутам; переопределяется через HTTP_CACHE_MAX_AGE_<ROUTE>
+DEFAULT_MAX_AGE = {
+    "popular": 300,
+    "search": 120,
+    "genre": 300,
+    "details": 3600,
+    "videos": 3600,
+    "reviews": 10,
+    "rating": 30,
+}
+HTTP_CACHE_MAX_AGE = {
+    route: int(os.getenv(f"HTTP_CACHE_MAX_AGE_{route.upper()}", str(age)))
+    for route, age in DEFAULT_MAX_AGE.items()
+}
+# -- сколько секунд после max-age браузер/прокси может отдавать старый ответ, перепроверяя его в фоне
+HTTP_CACHE_STALE_SECONDS = int(os.getenv("HTTP_CACHE_STALE_SECONDS", "600"))
+
+VARIANT_SUFFIXES = ('-br"', '-gzip"')
+
+
+def make_etag(*parts) -> str:
+    """Сильный ETag из частей, однозначно определяющих представление"""
+    raw = "|".join(str(part) for part in parts).encode()
+    return f'"{hashlib.blake2b(raw, digest_size=12).hexdigest()}"'
+
+
+def cache_control(route: str) -> str:
+    return f"public, max-age={HTTP_CACHE_MAX_AGE[route]}, stale-while-revalidate={HTTP_CACHE_STALE_SECONDS}"
+
+
+def _base_etag(tag: str) -> str:
+    # -- для If-None-Match сравнение слабое: W/"x" совпадает с "x"; сжатые варианты "x-br" / "x-gzip" — тоже
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in VARIANT_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or _base_etag(etag) in (_base_etag(tag) for tag in candidates)
+
+
+def is_not_modified(
+        etag: str,
+        if_none_match: Optional[str] = None,
+        last_modified: Optional[datetime] = None,
+        if_modified_since: Optional[str] = None,
+) -> bool:
+    """Можно ли ответить 304; If-Modified-Since учитывается, только если нет If-None-Match"""
+    if if_none_match:
+        return _etag_matches(if_none_match, etag)
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # -- asctime и RFC 850 с "-0000" разбираются без часового пояса: по RFC 9110 это GMT
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def _as_utc(value: datetime) -> datetime:
+    # -- в БД время хранится в UTC без часового пояса (datetime.utcnow)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def validator_headers(route: str, etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": cache_control(route)}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
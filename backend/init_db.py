@@ -1,6 +1,8 @@
 from backend.database import engine
 from backend import models
+from backend.migrations import migrate
 
 print("Initializing database...")
 models.Base.metadata.create_all(bind=engine)
+migrate(engine)
 print("OK")
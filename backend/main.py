@@ -1,41 +1,37 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional
+from typing import List, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import httpx
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
 import jwt
-from sqlalchemy.orm import Session
-from backend.database import SessionLocal, engine
+import orjson
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import AsyncSessionLocal, async_engine, async_pool_telemetry, engine
 from backend import models
 import html
 
-USE_TMDB_CACHE = str(os.getenv("USE_TMDB_CACHE", "")).lower() in ("1", "true", "yes")
-from backend.tmdb_cache import load_cache
-
 load_dotenv()
 
-# models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="Watch Cinema API",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
+from backend.tmdb_client import TmdbClient
+from backend import tmdb_cache
+from backend.cache_backends import build_backend
+from backend.passwords import PasswordHasher, PasswordHasherBusy, get_password_hash, verify_password
+from backend.pagination import DEFAULT_PAGE_SIZE, fetch_page
+from backend import rating_stats
+from backend.upsert import dialect_insert
+from backend.user_cache import UserCache, UserSnapshot
+from backend import cache_warmer, compression, http_cache, metrics, profiling, sql_instrumentation
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# models.Base.metadata.create_all(bind=engine)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
@@ -50,15 +46,74 @@ if not TMDB_API_KEY:
         "Please create a .env file with your TMDB API key. "
         "Get your API key from https://www.themoviedb.org/settings/api"
     )
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
 
+# -- ограничения пакетного запроса деталей фильмов
+MOVIE_BATCH_MAX_IDS = int(os.getenv("MOVIE_BATCH_MAX_IDS", "500"))
+MOVIE_BATCH_CONCURRENCY = int(os.getenv("MOVIE_BATCH_CONCURRENCY", "8"))
+
+# -- сколько последних фильмов хранится в истории просмотров пользователя
+HISTORY_DEPTH = int(os.getenv("HISTORY_DEPTH", "5"))
 
-def get_db():
-    db = SessionLocal()
+# -- один долгоживущий клиент TMDB на воркер, пул открывается/закрывается в lifespan;
+# -- L2-кэш (TMDB_L2_CACHE) общий для всех воркеров хоста;
+# -- в режиме фикстур (TMDB_FIXTURES / USE_TMDB_CACHE) ответы берутся из памяти или записываются
+tmdb = TmdbClient(api_key=TMDB_API_KEY, shared_cache=build_backend(), transport=tmdb_cache.build_transport())
+
+# -- bcrypt в ограниченном пуле потоков, чтобы не блокировать event loop
+password_hasher = PasswordHasher()
+
+# -- снимки авторизованных пользователей, чтобы не ходить в БД на каждый запрос
+user_cache = UserCache()
+
+# -- число и длительность SQL-запросов API в метриках Prometheus, счётчик на запрос и лог медленных запросов
+sql_instrumentation.instrument_engine(async_engine.sync_engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await tmdb.start()
+    password_hasher.start()
+    # -- прогрев кэша TMDB (CACHE_WARMER_ENABLED); из нескольких воркеров работает один
+    warmer = cache_warmer.start(tmdb, AsyncSessionLocal)
     try:
-        yield db
+        yield
     finally:
-        db.close()
+        if warmer is not None:
+            warmer.cancel()
+            await asyncio.gather(warmer, return_exceptions=True)
+        await tmdb.aclose()
+        password_hasher.shutdown()
+        metrics.mark_worker_dead()
+
+
+app = FastAPI(
+    title="Watch Cinema API",
+    docs_url="/docs",
+    redoc_url="/redoc",
+    lifespan=lifespan,
+    # -- ответы наших эндпоинтов сериализуются orjson (быстрее стандартного json)
+    default_response_class=ORJSONResponse,
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+# -- сжатие на лету для ответов, у которых нет готовых сжатых вариантов (отзывы, избранное и т.п.)
+app.add_middleware(compression.CompressionMiddleware)
+# -- профилирование по запросу подключается, только если задан PROFILE_SECRET или PROFILE_SAMPLE_RATE
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(sql_instrumentation.QueryCountMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
 
 
 class UserRegister(BaseModel):
@@ -121,50 +176,84 @@ class UserUpdate(BaseModel):
     password: Optional[str] = None
 
 
-def verify_password(plain_password, hashed_password):
-    password_bytes = plain_password.encode('utf-8')[:72]
-    return pwd_context.verify(password_bytes, hashed_password)
+class MovieBatchRequest(BaseModel):
+    ids: List[int]
 
 
-def get_password_hash(password):
-    password_bytes = password.encode('utf-8')[:72]
-    return pwd_context.hash(password_bytes)
+async def release_connection(db: AsyncSession):
+    """Вернуть соединение в пул перед долгой операцией (bcrypt); объекты не сбрасываются (expire_on_commit=False)"""
+    await db.commit()
+
+
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server is busy, please retry", headers={"Retry-After": "1"})
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server is busy, please retry", headers={"Retry-After": "1"})
 
 
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # -- iat входит в ключ кэша пользователя: новый токен — новый снимок
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+def decode_token(credentials: HTTPAuthorizationCredentials) -> dict:
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    return payload
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if user is None:
+
+async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
+    """id пользователя прямо из подписанного токена — без обращения к БД"""
+    return decode_token(credentials)["sub"]
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security),
+                           db: AsyncSession = Depends(get_db)) -> UserSnapshot:
+    payload = decode_token(credentials)
+    user_id, iat = payload["sub"], payload.get("iat")
+
+    user = user_cache.get(user_id, iat)
+    if user is not None:
+        return user
+
+    row = (await db.execute(select(
+        models.User.id, models.User.username, models.User.display_name, models.User.email, models.User.avatar_url
+    ).where(models.User.id == user_id))).first()
+    if row is None:
         raise HTTPException(status_code=401, detail="User not found")
+    user = UserSnapshot(**row._mapping)
+    user_cache.set(iat, user)
     return user
 
 
 @app.post("/api/auth/register", response_model=Token)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     """Регистрация нового пользователя"""
 
-    if db.query(models.User).filter(models.User.username == user_data.username).first():
+    if await db.scalar(select(models.User.id).where(models.User.username == user_data.username)):
         raise HTTPException(status_code=400, detail="Username already registered")
-    if db.query(models.User).filter(models.User.email == user_data.email).first():
+    if await db.scalar(select(models.User.id).where(models.User.email == user_data.email)):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user_data.password)
+    await release_connection(db)
+    hashed_password = await hash_password(user_data.password)
     user = models.User(
         username=user_data.username,
         display_name=user_data.username,
@@ -172,8 +261,8 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         hashed_password=hashed_password
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     access_token = create_access_token(data={"sub": user.id})
     return {
@@ -190,15 +279,16 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
 
 
 @app.post("/api/auth/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """Вход пользователя"""
-    user = db.query(models.User).filter(models.User.username == user_data.username).first()
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    user = await db.scalar(select(models.User).where(models.User.username == user_data.username))
+    await release_connection(db)
+    if not user or not await check_password(user_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
 
     if not user.display_name:
         user.display_name = user.username
-        db.commit()
+        await db.commit()
 
     access_token = create_access_token(data={"sub": user.id})
     return {
@@ -215,7 +305,7 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
 
 
 @app.get("/api/auth/me")
-async def get_me(current_user: models.User = Depends(get_current_user)):
+async def get_me(current_user: UserSnapshot = Depends(get_current_user)):
     """Получить текущего пользователя"""
     return {
         "id": current_user.id,
@@ -229,22 +319,34 @@ async def get_me(current_user: models.User = Depends(get_current_user)):
 @app.put("/api/auth/update")
 async def update_profile(
         update_data: UserUpdate,
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        user_id: int = Depends(get_current_user_id),
+        db: AsyncSession = Depends(get_db)
 ):
     """Обновить профиль пользователя"""
     if update_data.display_name:
         if len(update_data.display_name) < 3 or len(update_data.display_name) > 50:
             raise HTTPException(status_code=400, detail="Display name must be between 3 and 50 characters")
-        current_user.display_name = update_data.display_name
 
+    hashed_password = None
     if update_data.password:
         if len(update_data.password) < 6:
             raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
-        current_user.hashed_password = get_password_hash(update_data.password)
+        await release_connection(db)
+        hashed_password = await hash_password(update_data.password)
 
-    db.commit()
-    db.refresh(current_user)
+    current_user = await db.get(models.User, user_id)
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    if update_data.display_name and update_data.display_name != current_user.display_name:
+        current_user.display_name = update_data.display_name
+        # -- имя автора показывается в отзывах — их ETag должны смениться
+        await rating_stats.touch_user_movies(db, user_id)
+    if hashed_password:
+        current_user.hashed_password = hashed_password
+
+    await db.commit()
+    await db.refresh(current_user)
+    user_cache.invalidate(user_id)
 
     return {
         "id": current_user.id,
@@ -256,148 +358,197 @@ async def update_profile(
 
 
 @app.get("/api/favorites")
-async def get_favorites(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Получить избранные фильмы пользователя"""
-    favorites = db.query(models.Favorite).filter(models.Favorite.user_id == current_user.id).all()
-    return [{"movie_id": fav.movie_id, "added_at": fav.added_at} for fav in favorites]
+async def get_favorites(limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, movie_id: Optional[int] = None,
+                        user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    """Получить избранные фильмы пользователя (страницами; movie_id — проверить один фильм)"""
+    query = select(models.Favorite).where(models.Favorite.user_id == user_id)
+    if movie_id is not None:
+        query = query.where(models.Favorite.movie_id == movie_id)
+    favorites, next_cursor = await fetch_page(
+        db, query, models.Favorite.added_at, models.Favorite.id, limit, cursor, scalars=True
+    )
+    return {
+        "items": [{"movie_id": fav.movie_id, "added_at": fav.added_at} for fav in favorites],
+        "next_cursor": next_cursor,
+    }
 
 
 @app.post("/api/favorites")
-async def add_favorite(favorite: FavoriteCreate, current_user: models.User = Depends(get_current_user),
-                       db: Session = Depends(get_db)):
+async def add_favorite(favorite: FavoriteCreate, user_id: int = Depends(get_current_user_id),
+                       db: AsyncSession = Depends(get_db)):
     """Добавить фильм в избранное"""
-    existing = db.query(models.Favorite).filter(
-        models.Favorite.user_id == current_user.id,
-        models.Favorite.movie_id == favorite.movie_id
-    ).first()
+    # -- один запрос: при конфликте по (user_id, movie_id) строка не вставляется и RETURNING пуст
+    inserted = await db.scalar(
+        dialect_insert(db, models.Favorite)
+        .values(user_id=user_id, movie_id=favorite.movie_id)
+        .on_conflict_do_nothing(index_elements=["user_id", "movie_id"])
+        .returning(models.Favorite.id)
+    )
 
-    if existing:
+    if inserted is None:
         raise HTTPException(status_code=400, detail="Movie already in favorites")
 
-    new_favorite = models.Favorite(user_id=current_user.id, movie_id=favorite.movie_id)
-    db.add(new_favorite)
-    db.commit()
+    await db.commit()
     return {"message": "Added to favorites"}
 
 
 @app.delete("/api/favorites/{movie_id}")
-async def remove_favorite(movie_id: int, current_user: models.User = Depends(get_current_user),
-                          db: Session = Depends(get_db)):
+async def remove_favorite(movie_id: int, user_id: int = Depends(get_current_user_id),
+                          db: AsyncSession = Depends(get_db)):
     """Удалить фильм из избранного"""
-    favorite = db.query(models.Favorite).filter(
-        models.Favorite.user_id == current_user.id,
+    favorite = await db.scalar(select(models.Favorite).where(
+        models.Favorite.user_id == user_id,
         models.Favorite.movie_id == movie_id
-    ).first()
+    ))
 
     if not favorite:
         raise HTTPException(status_code=404, detail="Favorite not found")
 
-    db.delete(favorite)
-    db.commit()
+    await db.delete(favorite)
+    await db.commit()
     return {"message": "Removed from favorites"}
 
 
 @app.get("/api/history")
-async def get_watch_history(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_watch_history(limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                            user_id: int = Depends(get_current_user_id),
+                            db: AsyncSession = Depends(get_db)):
     """Получить историю просмотров"""
-    history = db.query(models.WatchHistory).filter(
-        models.WatchHistory.user_id == current_user.id
-    ).order_by(models.WatchHistory.watched_at.desc()).all()
-    return [{"movie_id": h.movie_id, "watched_at": h.watched_at} for h in history]
+    history, next_cursor = await fetch_page(
+        db,
+        select(models.WatchHistory).where(models.WatchHistory.user_id == user_id),
+        models.WatchHistory.watched_at, models.WatchHistory.id, limit, cursor, scalars=True
+    )
+    return {
+        "items": [{"movie_id": h.movie_id, "watched_at": h.watched_at} for h in history],
+        "next_cursor": next_cursor,
+    }
 
 
 @app.post("/api/history")
-async def add_to_history(history: WatchHistoryCreate, current_user: models.User = Depends(get_current_user),
-                         db: Session = Depends(get_db)):
+async def add_to_history(history: WatchHistoryCreate, user_id: int = Depends(get_current_user_id),
+                         db: AsyncSession = Depends(get_db)):
     """Добавить фильм в историю просмотров"""
-    existing = db.query(models.WatchHistory).filter(
-        models.WatchHistory.user_id == current_user.id,
-        models.WatchHistory.movie_id == history.movie_id
-    ).first()
-
-    if existing:
-        existing.watched_at = datetime.utcnow()
-        db.commit()
-        return {"message": "Updated watch history"}
-
-    new_history = models.WatchHistory(user_id=current_user.id, movie_id=history.movie_id)
-    db.add(new_history)
+    inserted = await db.scalar(
+        dialect_insert(db, models.WatchHistory)
+        .values(user_id=user_id, movie_id=history.movie_id)
+        .on_conflict_do_nothing(index_elements=["user_id", "movie_id"])
+        .returning(models.WatchHistory.id)
+    )
 
-    all_history = db.query(models.WatchHistory).filter(
-        models.WatchHistory.user_id == current_user.id
-    ).order_by(models.WatchHistory.watched_at.desc()).all()
+    if inserted is None:
+        # -- фильм уже в истории: только поднимаем его наверх
+        await db.execute(
+            update(models.WatchHistory).where(
+                models.WatchHistory.user_id == user_id,
+                models.WatchHistory.movie_id == history.movie_id
+            ).values(watched_at=datetime.utcnow())
+        )
+        await db.commit()
+        return {"message": "Updated watch history"}
 
-    if len(all_history) >= 5:
-        for old_entry in all_history[4:]:
-            db.delete(old_entry)
+    # -- одним DELETE убираем всё, что старше HISTORY_DEPTH последних записей (по индексу user_id, watched_at, id)
+    recent = select(models.WatchHistory.id).where(
+        models.WatchHistory.user_id == user_id
+    ).order_by(models.WatchHistory.watched_at.desc(), models.WatchHistory.id.desc()).limit(HISTORY_DEPTH)
+    await db.execute(
+        delete(models.WatchHistory).where(
+            models.WatchHistory.user_id == user_id,
+            models.WatchHistory.id.not_in(recent)
+        )
+    )
 
-    db.commit()
+    await db.commit()
     return {"message": "Added to watch history"}
 
 
 @app.delete("/api/reviews/{review_id}")
-async def delete_review(review_id: int, current_user: models.User = Depends(get_current_user),
-                        db: Session = Depends(get_db)):
+async def delete_review(review_id: int, user_id: int = Depends(get_current_user_id),
+                        db: AsyncSession = Depends(get_db)):
     """Удалить отзыв пользователя"""
-    review = db.query(models.Review).filter(models.Review.id == review_id).first()
+    review = await db.scalar(select(models.Review).where(models.Review.id == review_id))
 
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
 
-    if review.user_id != current_user.id:
+    if review.user_id != user_id:
         raise HTTPException(status_code=403, detail="You can only delete your own reviews")
 
-    db.delete(review)
-    db.commit()
+    # -- агрегаты оценок меняются в той же транзакции, что и сам отзыв
+    await rating_stats.remove_rating(db, review.movie_id, review.rating)
+    await db.delete(review)
+    await db.commit()
     return {"message": "Review deleted successfully"}
 
 
 @app.get("/api/reviews/{movie_id}")
-async def get_movie_reviews(movie_id: int, db: Session = Depends(get_db)):
-    """Получить отзывы о фильме"""
-    reviews = db.query(models.Review).filter(models.Review.movie_id == movie_id).order_by(
-        models.Review.created_at.desc()
-    ).all()
-
-    result = []
-    for review in reviews:
-        user = db.query(models.User).filter(models.User.id == review.user_id).first()
-        result.append({
-            "id": review.id,
-            "rating": review.rating,
-            "comment": review.comment,
-            "created_at": review.created_at.isoformat(),
+async def get_movie_reviews(movie_id: int, response: Response, limit: int = DEFAULT_PAGE_SIZE,
+                            cursor: Optional[str] = None, db: AsyncSession = Depends(get_db),
+                            if_none_match: Optional[str] = Header(None),
+                            if_modified_since: Optional[str] = Header(None)):
+    """Получить отзывы о фильме (страницами, от новых к старым)"""
+    # -- валидатор — версия отзывов фильма (запрос по первичному ключу); при совпадении страницу не читаем
+    version, updated_at = await rating_stats.get_version(db, movie_id)
+    headers = http_cache.validator_headers(
+        "reviews", http_cache.make_etag("reviews", movie_id, version, updated_at, limit, cursor), updated_at
+    )
+    if http_cache.is_not_modified(headers["ETag"], if_none_match, updated_at, if_modified_since):
+        return http_cache.not_modified(headers)
+    response.headers.update(headers)
+
+    # -- автор подтягивается тем же запросом (JOIN), только нужные колонки
+    query = select(
+        models.Review.id,
+        models.Review.rating,
+        models.Review.comment,
+        models.Review.created_at,
+        models.User.id.label("user_id"),
+        models.User.username,
+        models.User.display_name,
+        models.User.avatar_url,
+    ).join(models.User, models.User.id == models.Review.user_id).where(
+        models.Review.movie_id == movie_id
+    )
+    page, next_cursor = await fetch_page(db, query, models.Review.created_at, models.Review.id, limit, cursor)
+
+    return {
+        "items": [{
+            "id": row.id,
+            "rating": row.rating,
+            "comment": row.comment,
+            "created_at": row.created_at.isoformat(),
             "user": {
-                "id": user.id,
-                "username": user.display_name if user.display_name else user.username,
-                "avatar_url": user.avatar_url
+                "id": row.user_id,
+                "username": row.display_name if row.display_name else row.username,
+                "avatar_url": row.avatar_url
             }
-        })
-    return result
+        } for row in page],
+        "next_cursor": next_cursor,
+    }
 
 
 @app.post("/api/reviews")
-async def create_review(review: ReviewCreate, current_user: models.User = Depends(get_current_user),
-                        db: Session = Depends(get_db)):
+async def create_review(review: ReviewCreate, current_user: UserSnapshot = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_db)):
     """Создать отзыв о фильме"""
 
-    existing = db.query(models.Review).filter(
-        models.Review.user_id == current_user.id,
-        models.Review.movie_id == review.movie_id
-    ).first()
-
-    if existing:
+    new_review = (await db.execute(
+        dialect_insert(db, models.Review)
+        .values(
+            user_id=current_user.id,
+            movie_id=review.movie_id,
+            rating=review.rating,
+            comment=review.comment
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "movie_id"])
+        .returning(models.Review.id, models.Review.rating, models.Review.comment, models.Review.created_at)
+    )).first()
+
+    if new_review is None:
         raise HTTPException(status_code=400, detail="You already reviewed this movie")
 
-    new_review = models.Review(
-        user_id=current_user.id,
-        movie_id=review.movie_id,
-        rating=review.rating,
-        comment=review.comment
-    )
-    db.add(new_review)
-    db.commit()
-    db.refresh(new_review)
+    await rating_stats.add_rating(db, review.movie_id, review.rating)
+    await db.commit()
 
     return {
         "id": new_review.id,
@@ -413,23 +564,90 @@ async def create_review(review: ReviewCreate, current_user: models.User = Depend
 
 
 @app.get("/api/users/{user_id}/reviews")
-async def get_user_reviews(user_id: int, db: Session = Depends(get_db)):
-    """Получить все отзывы пользователя"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user_reviews(user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                           db: AsyncSession = Depends(get_db)):
+    """Получить отзывы пользователя (страницами, от новых к старым)"""
+    user = await db.scalar(select(models.User.id).where(models.User.id == user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    reviews = db.query(models.Review).filter(models.Review.user_id == user_id).order_by(
-        models.Review.created_at.desc()
-    ).all()
+    reviews, next_cursor = await fetch_page(
+        db,
+        select(models.Review).where(models.Review.user_id == user_id),
+        models.Review.created_at, models.Review.id, limit, cursor, scalars=True
+    )
 
-    return [{
-        "id": review.id,
-        "movie_id": review.movie_id,
-        "rating": review.rating,
-        "comment": review.comment,
-        "created_at": review.created_at.isoformat()
-    } for review in reviews]
+    return {
+        "items": [{
+            "id": review.id,
+            "movie_id": review.movie_id,
+            "rating": review.rating,
+            "comment": review.comment,
+            "created_at": review.created_at.isoformat()
+        } for review in reviews],
+        "next_cursor": next_cursor,
+    }
+
+
+@app.get("/api/me/dashboard")
+async def get_dashboard(current_user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Профиль и первые страницы избранного, истории и отзывов пользователя одним запросом"""
+    favorites, favorites_cursor = await fetch_page(
+        db, select(models.Favorite).where(models.Favorite.user_id == current_user.id),
+        models.Favorite.added_at, models.Favorite.id, DEFAULT_PAGE_SIZE, None, scalars=True
+    )
+    history, history_cursor = await fetch_page(
+        db, select(models.WatchHistory).where(models.WatchHistory.user_id == current_user.id),
+        models.WatchHistory.watched_at, models.WatchHistory.id, DEFAULT_PAGE_SIZE, None, scalars=True
+    )
+    reviews, reviews_cursor = await fetch_page(
+        db, select(models.Review).where(models.Review.user_id == current_user.id),
+        models.Review.created_at, models.Review.id, DEFAULT_PAGE_SIZE, None, scalars=True
+    )
+
+    # -- все фильмы всех разделов — одним параллельным проходом по кэшу/TMDB
+    summaries = await _movie_summaries(
+        [fav.movie_id for fav in favorites]
+        + [h.movie_id for h in history]
+        + [review.movie_id for review in reviews]
+    )
+
+    return {
+        "user": {
+            "id": current_user.id,
+            "username": current_user.username,
+            "display_name": current_user.display_name,
+            "email": current_user.email,
+            "avatar_url": current_user.avatar_url
+        },
+        "favorites": {
+            "items": [{
+                "movie_id": fav.movie_id,
+                "added_at": fav.added_at,
+                "movie": summaries[fav.movie_id]
+            } for fav in favorites],
+            "next_cursor": favorites_cursor,
+        },
+        "history": {
+            "items": [{
+                "movie_id": h.movie_id,
+                "watched_at": h.watched_at,
+                "movie": summaries[h.movie_id]
+            } for h in history],
+            "next_cursor": history_cursor,
+        },
+        "reviews": {
+            "items": [{
+                "id": review.id,
+                "movie_id": review.movie_id,
+                "rating": review.rating,
+                "comment": review.comment,
+                "created_at": review.created_at.isoformat(),
+                "movie": summaries[review.movie_id]
+            } for review in reviews],
+            "next_cursor": reviews_cursor,
+        },
+    }
 
 
 @app.get("/")
@@ -437,100 +655,191 @@ async def root():
     return {"message": "Watch Cinema API"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Метрики в формате Prometheus (в multiprocess-режиме — сумма по всем воркерам)"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Статистика кэша ответов TMDB (попадания/промахи/объём)"""
+    if tmdb.cache is None:
+        return {"enabled": False}
+    shared = tmdb.shared_cache.stats() if tmdb.shared_cache is not None else None
+    return {"enabled": True, **tmdb.cache.stats(), "shared": shared}
+
+
+@app.get("/api/db/pool")
+async def get_db_pool_stats():
+    """Телеметрия пула соединений БД этого воркера (ожидание, занятые соединения, overflow)"""
+    return {"status": async_engine.pool.status(), **async_pool_telemetry.stats()}
+
+
+def _passthrough(payload, route: str, request: Request) -> Response:
+    """Ответ TMDB клиенту как есть: без разбора JSON и повторной сериализации.
+
+    Сжатый вариант выбирается по Accept-Encoding из готовых (Payload.precompress); 304, если ETag совпал.
+    """
+    body, encoding = payload.variant(request.headers.get("accept-encoding"))
+    headers = http_cache.validator_headers(route, compression.variant_etag(payload.etag, encoding))
+    headers["Vary"] = "Accept-Encoding"
+    if http_cache.is_not_modified(payload.etag, request.headers.get("if-none-match")):
+        return http_cache.not_modified(headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @app.get("/api/movies/popular")
-async def get_popular_movies(page: int = 1):
+async def get_popular_movies(request: Request, page: int = 1):
     """Получить популярные фильмы"""
 
-    # -- если тестовый режим > json из кэша
-    if USE_TMDB_CACHE:
-        return load_cache(f"popular_page_{page}.json")
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{TMDB_BASE_URL}/movie/popular",
-                params={"api_key": TMDB_API_KEY, "language": "ru-RU", "page": page},
-            )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=500, detail=f"Error fetching movies: {str(e)}")
+    try:
+        return _passthrough(await tmdb.fetch_payload("popular", "/movie/popular", {"page": page}), "popular", request)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching movies: {str(e)}")
 
 
 @app.get("/api/movies/search")
-async def search_movies(query: str, page: int = 1):
+async def search_movies(request: Request, query: str, page: int = 1):
     """Поиск фильмов по названию"""
 
-    # -- если тестовый режим > json из кэша
-    if USE_TMDB_CACHE:
-        return load_cache("search_avatar.json")
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{TMDB_BASE_URL}/search/movie",
-                params={"api_key": TMDB_API_KEY, "language": "ru-RU", "query": query, "page": page},
-            )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=500, detail=f"Error searching movies: {str(e)}")
+    try:
+        payload = await tmdb.fetch_payload("search", "/search/movie", {"query": query, "page": page})
+        return _passthrough(payload, "search", request)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Error searching movies: {str(e)}")
 
 
 @app.get("/api/movies/genre/{genre_id}")
-async def get_movies_by_genre(genre_id: int, page: int = 1):
+async def get_movies_by_genre(genre_id: int, request: Request, page: int = 1):
     """Получить фильмы по жанру"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{TMDB_BASE_URL}/discover/movie",
-                params={
-                    "api_key": TMDB_API_KEY,
-                    "language": "ru-RU",
-                    "page": page,
-                    "with_genres": genre_id,
-                    "sort_by": "popularity.desc"
-                },
-            )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=500, detail=f"Error fetching movies by genre: {str(e)}")
+    try:
+        payload = await tmdb.fetch_payload(
+            "genre",
+            "/discover/movie",
+            {"page": page, "with_genres": genre_id, "sort_by": "popularity.desc"},
+        )
+        return _passthrough(payload, "genre", request)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching movies by genre: {str(e)}")
+
+
+async def _resolve_movie(movie_id: int, limiter: Optional[asyncio.Semaphore] = None):
+    """Детали одного фильма в формате пакетного ответа: {"id", "movie"} или {"id", "error"}"""
+    try:
+        data = await tmdb.fetch("details", f"/movie/{movie_id}", limiter=limiter)
+    except httpx.HTTPError as e:
+        return {"id": movie_id, "error": f"Movie not found: {str(e)}"}
+    except orjson.JSONDecodeError:
+        # -- битое тело одного фильма не должно ронять всю пачку
+        return {"id": movie_id, "error": "Malformed TMDB response"}
+    if not isinstance(data, dict):
+        return {"id": movie_id, "error": "Malformed TMDB response"}
+    return {"id": movie_id, "movie": data}
+
+
+async def _resolve_movies(movie_ids: List[int]):
+    """Детали фильмов пачкой: параллельно, но не больше MOVIE_BATCH_CONCURRENCY запросов к TMDB"""
+    if len(movie_ids) > MOVIE_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many movie ids (max {MOVIE_BATCH_MAX_IDS})")
+
+    limiter = asyncio.Semaphore(MOVIE_BATCH_CONCURRENCY)
+
+    # -- повторяющиеся id запрашиваем один раз, ответ — в порядке входного списка
+    unique_ids = list(dict.fromkeys(movie_ids))
+    resolved = await asyncio.gather(*[_resolve_movie(movie_id, limiter) for movie_id in unique_ids])
+    by_id = dict(zip(unique_ids, resolved))
+    return {"results": [by_id[movie_id] for movie_id in movie_ids]}
+
+
+def _movie_summary(movie: Optional[dict]):
+    """Краткая карточка фильма вместо полного документа TMDB"""
+    if not movie:
+        return None
+    return {
+        "id": movie.get("id"),
+        "title": movie.get("title"),
+        "poster_path": movie.get("poster_path"),
+        "vote_average": movie.get("vote_average"),
+        # -- жанр и год показываются в карточках профиля
+        "release_date": movie.get("release_date"),
+        "genres": movie.get("genres") or [],
+    }
+
+
+async def _movie_summaries(movie_ids: List[int]):
+    """Краткие карточки фильмов по id: TMDB-запросы параллельно, с ограничением MOVIE_BATCH_CONCURRENCY"""
+    limiter = asyncio.Semaphore(MOVIE_BATCH_CONCURRENCY)
+    unique_ids = list(dict.fromkeys(movie_ids))
+    resolved = await asyncio.gather(*[_resolve_movie(movie_id, limiter) for movie_id in unique_ids])
+    return {movie_id: _movie_summary(item.get("movie")) for movie_id, item in zip(unique_ids, resolved)}
+
+
+def _parse_movie_ids(ids: str) -> List[int]:
+    try:
+        return [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+
+
+@app.get("/api/movies/batch")
+async def get_movies_batch(ids: str):
+    """Получить детали нескольких фильмов одним запросом (ids=1,2,3)"""
+    return await _resolve_movies(_parse_movie_ids(ids))
+
+
+@app.post("/api/movies/batch")
+async def post_movies_batch(batch: MovieBatchRequest):
+    """Получить детали нескольких фильмов одним запросом (для длинных списков)"""
+    return await _resolve_movies(batch.ids)
+
+
+@app.get("/api/movies/ratings")
+async def get_movies_ratings(ids: str, db: AsyncSession = Depends(get_db)):
+    """Сводки оценок нескольких фильмов одним запросом (ids=1,2,3)"""
+    movie_ids = list(dict.fromkeys(_parse_movie_ids(ids)))
+    if len(movie_ids) > MOVIE_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many movie ids (max {MOVIE_BATCH_MAX_IDS})")
+    summaries = await rating_stats.get_summaries(db, movie_ids)
+    return {"results": [summaries[movie_id] for movie_id in movie_ids]}
+
+
+@app.get("/api/movies/{movie_id}/rating")
+async def get_movie_rating(movie_id: int, response: Response, db: AsyncSession = Depends(get_db),
+                           if_none_match: Optional[str] = Header(None),
+                           if_modified_since: Optional[str] = Header(None)):
+    """Сводка пользовательских оценок фильма: число отзывов, средняя, гистограмма 1–10"""
+    stats = await db.get(models.MovieRatingStats, movie_id)
+    version, updated_at = (stats.version, stats.updated_at) if stats else (0, None)
+    headers = http_cache.validator_headers(
+        "rating", http_cache.make_etag("rating", movie_id, version, updated_at), updated_at
+    )
+    if http_cache.is_not_modified(headers["ETag"], if_none_match, updated_at, if_modified_since):
+        return http_cache.not_modified(headers)
+    response.headers.update(headers)
+    return rating_stats.to_summary(movie_id, stats)
 
 
 @app.get("/api/movies/{movie_id}")
-async def get_movie_details(movie_id: int):
+async def get_movie_details(movie_id: int, request: Request):
     """Получить детали фильма"""
 
-    # -- если тестовый режим > json из кэша
-    if USE_TMDB_CACHE:
-        return load_cache(f"movie_{movie_id}.json") or {"error": "not found"}
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{TMDB_BASE_URL}/movie/{movie_id}",
-                params={"api_key": TMDB_API_KEY, "language": "ru-RU"},
-            )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=404, detail=f"Movie not found: {str(e)}")
+    try:
+        return _passthrough(await tmdb.fetch_payload("details", f"/movie/{movie_id}"), "details", request)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=404, detail=f"Movie not found: {str(e)}")
 
 
 @app.get("/api/movies/{movie_id}/videos")
-async def get_movie_videos(movie_id: int):
+async def get_movie_videos(movie_id: int, request: Request):
     """Получить трейлеры и видео фильма"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{TMDB_BASE_URL}/movie/{movie_id}/videos",
-                params={"api_key": TMDB_API_KEY, "language": "ru-RU"},
-            )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            raise HTTPException(status_code=404, detail=f"Videos not found: {str(e)}")
+    try:
+        return _passthrough(await tmdb.fetch_payload("videos", f"/movie/{movie_id}/videos"), "videos", request)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=404, detail=f"Videos not found: {str(e)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+"""
+Метрики Prometheus: HTTP, TMDB, кэши, запросы к БД и очередь bcrypt.
+
+С несколькими воркерами uvicorn (run.py) задайте PROMETHEUS_MULTIPROC_DIR до старта процессов —
+тогда каждый воркер пишет значения в свой файл в этом каталоге, а /metrics суммирует их все.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+# -- маршруты, которых нет в приложении, собираются под одной меткой, чтобы не плодить ряды
+UNMATCHED_ROUTE = "unmatched"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status", ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being processed", ["method"], multiprocess_mode="livesum",
+)
+
+TMDB_LATENCY = Histogram(
+    "tmdb_upstream_duration_seconds", "Latency of requests to TMDB by endpoint", ["endpoint"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+TMDB_ERRORS = Counter(
+    "tmdb_upstream_errors_total", "Failed requests to TMDB by endpoint", ["endpoint", "kind"],
+)
+# -- доля попаданий: sum(rate(...{result=~"hit|stale"})) / sum(rate(...))
+CACHE_LOOKUPS = Counter(
+    "tmdb_cache_lookups_total", "TMDB response cache lookups", ["layer", "result"],
+)
+
+CACHE_WARMER_REFRESHES = Counter(
+    "tmdb_cache_warmer_refreshes_total", "Background cache warmer refreshes", ["endpoint", "result"],
+)
+
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["operation"])
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement duration", ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+
+PASSWORD_HASH_QUEUE = Histogram(
+    "password_hash_queue_seconds", "Time a bcrypt operation waits for a free worker", ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: задержка, статусы и число выполняющихся запросов по шаблону маршрута"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None
+
+    def _route_template(self, scope) -> str:
+        # -- Starlette кладёт в scope endpoint найденного маршрута; шаблон пути берём из таблицы маршрутов
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._routes is None:
+            app = scope.get("app")
+            routes = getattr(app, "routes", [])
+            self._routes = {route.endpoint: route.path for route in routes if hasattr(route, "endpoint")}
+        return self._routes.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            route = self._route_template(scope)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+
+
+def _operation(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+
+def observe_query(statement: str, duration: float):
+    """Учесть выполненный SQL-запрос; вызывается из общего хука курсора (sql_instrumentation)"""
+    operation = _operation(statement)
+    DB_QUERIES.labels(operation).inc()
+    DB_QUERY_LATENCY.labels(operation).observe(duration)
+
+
+def render():
+    """Тело и Content-Type ответа /metrics (с агрегацией по воркерам в multiprocess-режиме)"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead():
+    """Убрать livesum-гейджи завершившегося воркера из общей статистики"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
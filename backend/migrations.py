@@ -0,0 +1,83 @@
+from sqlalchemy import delete, func, inspect, select, text
+from sqlalchemy.orm import Session
+
+from backend.database import engine
+from backend import models, rating_stats
+
+
+# -- уникальные индексы (user_id, movie_id) и какую из дублирующихся строк оставить
+UNIQUE_USER_MOVIE = {
+    "ux_favorites_user_movie": (models.Favorite, func.min),
+    "ux_reviews_user_movie": (models.Review, func.min),
+    # -- в истории оставляем последнюю запись
+    "ux_watch_history_user_movie": (models.WatchHistory, func.max),
+}
+
+
+def dedupe_user_movie(bind=engine) -> int:
+    """Удалить дубликаты (user_id, movie_id), мешающие создать уникальные индексы.
+
+    Работает только для таблиц, где уникального индекса ещё нет; возвращает число удалённых строк.
+    """
+    inspector = inspect(bind)
+    removed = 0
+    with Session(bind) as session:
+        for name, (model, keep) in UNIQUE_USER_MOVIE.items():
+            if not inspector.has_table(model.__tablename__):
+                continue
+            if name in {ix["name"] for ix in inspector.get_indexes(model.__tablename__)}:
+                continue
+            survivors = select(keep(model.id)).group_by(model.user_id, model.movie_id)
+            result = session.execute(delete(model).where(model.id.not_in(survivors)))
+            removed += result.rowcount or 0
+        session.commit()
+    return removed
+
+
+def ensure_indexes(bind=engine):
+    """Создать индексы из моделей, которых нет в уже существующей БД (create_all не трогает старые таблицы)"""
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def ensure_columns(bind=engine):
+    """Добавить в существующие таблицы новые колонки моделей (нужен server_default или nullable)"""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                conn.execute(text(ddl))
+
+
+def backfill_rating_stats(bind=engine):
+    """Заполнить movie_rating_stats для базы, где отзывы появились раньше таблицы агрегатов"""
+    with Session(bind) as session:
+        has_reviews = session.scalar(select(models.Review.id).limit(1)) is not None
+        has_stats = session.scalar(select(models.MovieRatingStats.movie_id).limit(1)) is not None
+        if has_reviews and not has_stats:
+            rating_stats.rebuild(session)
+
+
+def migrate(bind=engine):
+    # -- новые таблицы (например, movie_rating_stats) создаются, существующие не трогаются
+    models.Base.metadata.create_all(bind=bind)
+    ensure_columns(bind)
+    removed = dedupe_user_movie(bind)
+    ensure_indexes(bind)
+    if removed:
+        # -- удалённые дубликаты отзывов уже учтены в агрегатах — пересчитываем их
+        with Session(bind) as session:
+            rating_stats.rebuild(session)
+    else:
+        backfill_rating_stats(bind)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from backend.database import Base
@@ -27,6 +27,12 @@ class Favorite(Base):
     """Модель избранных фильмов"""
 
     __tablename__ = "favorites"
+    __table_args__ = (
+        # -- keyset-пагинация избранного пользователя: (added_at, id)
+        Index("ix_favorites_user_added", "user_id", "added_at", "id"),
+        # -- один фильм в избранном пользователя один раз; цель для INSERT ... ON CONFLICT
+        Index("ux_favorites_user_movie", "user_id", "movie_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -41,6 +47,13 @@ class Review(Base):
     """Модель отзывов"""
 
     __tablename__ = "reviews"
+    __table_args__ = (
+        # -- keyset-пагинация отзывов фильма и отзывов пользователя: (created_at, id)
+        Index("ix_reviews_movie_created", "movie_id", "created_at", "id"),
+        Index("ix_reviews_user_created", "user_id", "created_at", "id"),
+        # -- один отзыв пользователя на фильм
+        Index("ux_reviews_user_movie", "user_id", "movie_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -57,6 +70,12 @@ class WatchHistory(Base):
     """Модель истории просмотров"""
 
     __tablename__ = "watch_history"
+    __table_args__ = (
+        # -- keyset-пагинация истории пользователя: (watched_at, id)
+        Index("ix_watch_history_user_watched", "user_id", "watched_at", "id"),
+        # -- фильм в истории пользователя один раз, повторный просмотр обновляет watched_at
+        Index("ux_watch_history_user_movie", "user_id", "movie_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -65,3 +84,27 @@ class WatchHistory(Base):
 
     # Relationships
     user = relationship("User", back_populates="watch_history")
+
+
+class MovieRatingStats(Base):
+    """Агрегаты оценок фильма: обновляются вместе с отзывами, чтение за O(1)"""
+
+    __tablename__ = "movie_rating_stats"
+
+    movie_id = Column(Integer, primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    # Гистограмма оценок 1–10
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
+    rating_6 = Column(Integer, nullable=False, default=0)
+    rating_7 = Column(Integer, nullable=False, default=0)
+    rating_8 = Column(Integer, nullable=False, default=0)
+    rating_9 = Column(Integer, nullable=False, default=0)
+    rating_10 = Column(Integer, nullable=False, default=0)
+    # Версия отзывов фильма: растёт при любом изменении, из неё строятся ETag
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,57 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Непрозрачный курсор из ключа сортировки последней строки страницы"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after(timestamp_column, id_column, cursor: Optional[str]):
+    """Условие «строго после курсора» для сортировки (timestamp DESC, id DESC)"""
+    if not cursor:
+        return None
+    timestamp, row_id = decode_cursor(cursor)
+    return or_(
+        timestamp_column < timestamp,
+        and_(timestamp_column == timestamp, id_column < row_id),
+    )
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+async def fetch_page(db, query, timestamp_column, id_column, limit: int, cursor: Optional[str], scalars: bool = False):
+    """Одна страница keyset-пагинации: (строки, next_cursor или None)"""
+    limit = clamp_limit(limit)
+    after = keyset_after(timestamp_column, id_column, cursor)
+    if after is not None:
+        query = query.where(after)
+    # -- берём на одну строку больше, чтобы понять, есть ли следующая страница
+    query = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1)
+    result = await (db.scalars(query) if scalars else db.execute(query))
+    rows = result.all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+    return page, next_cursor
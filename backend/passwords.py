@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from backend.metrics import PASSWORD_HASH_QUEUE
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# -- bcrypt выполняется в отдельном пуле, чтобы не блокировать event loop воркера
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# -- сколько операций может ждать свободного потока; сверх этого — 503
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+# -- thread (bcrypt отпускает GIL) или process
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+
+
+def verify_password(plain_password, hashed_password):
+    password_bytes = plain_password.encode('utf-8')[:72]
+    return pwd_context.verify(password_bytes, hashed_password)
+
+
+def get_password_hash(password):
+    password_bytes = password.encode('utf-8')[:72]
+    return pwd_context.hash(password_bytes)
+
+
+def _timed(fn, *args):
+    # -- время старта в воркере пула (wall clock — годится и для процессов); разница с постановкой — ожидание в очереди
+    return time.time(), fn(*args)
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь хеширования переполнена"""
+
+
+class PasswordHasher:
+    """Ограниченный пул для bcrypt: хеширование и проверка паролей вне event loop"""
+
+    def __init__(
+            self,
+            workers: int = PASSWORD_HASH_WORKERS,
+            max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+            executor_kind: str = PASSWORD_HASH_EXECUTOR,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor_kind = executor_kind
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.rejected = 0
+
+    def _build_executor(self) -> Executor:
+        if self.executor_kind == "process":
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._build_executor()
+        return self._executor
+
+    def start(self):
+        if self.workers > 0 and self._executor is None:
+            self._executor = self._build_executor()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _run(self, operation: str, fn, *args):
+        # -- workers=0: синхронно в event loop (для сравнения в бенчмарке)
+        if self.workers <= 0:
+            return fn(*args)
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+        self.pending += 1
+        try:
+            queued_at = time.time()
+            started_at, result = await asyncio.get_running_loop().run_in_executor(self.executor, _timed, fn, *args)
+            PASSWORD_HASH_QUEUE.labels(operation).observe(max(0.0, started_at - queued_at))
+            return result
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", verify_password, plain_password, hashed_password)
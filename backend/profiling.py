@@ -0,0 +1,196 @@
+"""
+Профилирование отдельных запросов по требованию.
+
+Профиль снимается, если запрос пришёл с подписанным заголовком X-Profile (см. make_token)
+или попал в случайную выборку PROFILE_SAMPLE_RATE. Статистический сэмплер раз в
+PROFILE_INTERVAL секунд снимает стеки всех потоков (event loop, bcrypt, to_thread) и пишет их
+в формате folded stacks — его понимают flamegraph.pl, speedscope и inferno.
+
+Стеки не отфильтрованы по запросу: сэмплер видит весь процесс, а event loop и пул потоков
+в это время обслуживают и другие запросы — их кадры тоже попадают в профиль. Чистый профиль
+одного запроса получается при низкой нагрузке; под нагрузкой это профиль воркера за время запроса.
+
+Если ни PROFILE_SECRET, ни PROFILE_SAMPLE_RATE не заданы, middleware не подключается вовсе.
+
+    python -m backend.profiling --token --ttl 300   # значение заголовка X-Profile
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "watch_profiles"))
+# -- сколько последних профилей хранить в каталоге
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILING_ENABLED = bool(PROFILE_SECRET) or PROFILE_SAMPLE_RATE > 0
+
+PROFILE_HEADER = b"x-profile"
+
+# -- потоки, которые просто ждут работу, в профиль не попадают
+IDLE_FRAMES = {("thread.py", "_worker"), ("threading.py", "wait")}
+
+
+def make_token(secret: str = PROFILE_SECRET, ttl: int = 300) -> str:
+    """Значение заголовка X-Profile: срок действия и HMAC-SHA256 от него"""
+    expires = str(int(time.time()) + ttl)
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_token(token: str, secret: str = PROFILE_SECRET) -> bool:
+    if not secret:
+        return False
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Сэмплер стеков всех потоков процесса в отдельном потоке: считает одинаковые стеки (folded stacks)"""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(skip=own)
+
+    def sample(self, skip: Optional[int] = None):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        self.samples += 1
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.counts[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware: профилирует запрос с подписанным X-Profile или из случайной выборки.
+
+    Одновременно профилируется не больше одного запроса — так профили не пересекаются по времени,
+    а накладные расходы остаются предсказуемыми. В профиль попадают и стеки других запросов,
+    выполнявшихся в это время в том же воркере. Имя файла возвращается в X-Profile-File.
+    """
+
+    def __init__(
+            self,
+            app,
+            secret: str = PROFILE_SECRET,
+            sample_rate: float = PROFILE_SAMPLE_RATE,
+            spool_dir: str = PROFILE_DIR,
+            max_files: int = PROFILE_MAX_FILES,
+            interval: float = PROFILE_INTERVAL,
+    ):
+        self.app = app
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.spool_dir = spool_dir
+        self.max_files = max_files
+        self.interval = interval
+        self._active = False
+
+    def _wanted(self, scope) -> bool:
+        if self._active:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return verify_token(value.decode("latin-1"), self.secret)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        slug = scope["path"].strip("/").replace("/", "_") or "root"
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method']}-{slug[:60]}-{uuid.uuid4().hex[:8]}.folded"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-file", filename.encode())]
+            await send(message)
+
+        self._active = True
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            self._active = False
+            await asyncio.to_thread(self._write, filename, sampler.folded())
+
+    def _write(self, filename: str, folded: str):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        with open(os.path.join(self.spool_dir, filename), "w", encoding="utf-8") as f:
+            f.write(folded)
+        # -- храним только max_files последних профилей
+        profiles = sorted(
+            (entry for entry in os.scandir(self.spool_dir) if entry.name.endswith(".folded")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in profiles[:max(0, len(profiles) - self.max_files)]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--token", action="store_true", help="напечатать значение заголовка X-Profile")
+    parser.add_argument("--ttl", type=int, default=300, help="срок действия токена в секундах")
+    args = parser.parse_args(argv)
+    if not PROFILE_SECRET:
+        parser.error("PROFILE_SECRET is not set")
+    if args.token:
+        print(make_token(PROFILE_SECRET, args.ttl))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
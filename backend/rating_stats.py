@@ -0,0 +1,174 @@
+"""
+Агрегаты пользовательских оценок фильмов (таблица movie_rating_stats).
+
+Счётчики меняются в той же транзакции, что и отзывы (create_review / delete_review),
+вместе с ними растёт version — по ней строятся ETag отзывов и оценок фильма.
+Пересчёт с нуля и проверка расхождений:
+
+    python -m backend.rating_stats --check     # только показать расхождения
+    python -m backend.rating_stats --rebuild   # пересчитать таблицу из reviews
+"""
+import argparse
+import sys
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, func, select, update
+
+from backend import models
+from backend.upsert import dialect_insert
+
+RATINGS = range(1, 11)
+
+
+def _histogram_column(rating: int):
+    return getattr(models.MovieRatingStats, f"rating_{rating}")
+
+
+async def add_rating(db, movie_id: int, rating: int):
+    """Учесть новый отзыв: один INSERT ... ON CONFLICT DO UPDATE"""
+    stats = models.MovieRatingStats
+    column = _histogram_column(rating)
+    now = datetime.utcnow()
+    values = {"movie_id": movie_id, "review_count": 1, "rating_sum": rating, "version": 1, "updated_at": now}
+    values.update({f"rating_{r}": int(r == rating) for r in RATINGS})
+    statement = dialect_insert(db, stats).values(**values).on_conflict_do_update(
+        index_elements=[stats.movie_id],
+        set_={
+            "review_count": stats.review_count + 1,
+            "rating_sum": stats.rating_sum + rating,
+            column.key: column + 1,
+            "version": stats.version + 1,
+            "updated_at": now,
+        },
+    )
+    await db.execute(statement)
+
+
+async def remove_rating(db, movie_id: int, rating: int):
+    """Убрать удалённый отзыв из агрегатов"""
+    stats = models.MovieRatingStats
+    column = _histogram_column(rating)
+    await db.execute(
+        update(stats).where(stats.movie_id == movie_id).values({
+            stats.review_count: stats.review_count - 1,
+            stats.rating_sum: stats.rating_sum - rating,
+            column: column - 1,
+            stats.version: stats.version + 1,
+            stats.updated_at: datetime.utcnow(),
+        })
+    )
+
+
+async def touch_user_movies(db, user_id: int):
+    """Сменить версию фильмов с отзывами пользователя (изменились имя или аватар автора)"""
+    stats = models.MovieRatingStats
+    reviewed = select(models.Review.movie_id).where(models.Review.user_id == user_id)
+    await db.execute(
+        update(stats).where(stats.movie_id.in_(reviewed)).values({
+            stats.version: stats.version + 1,
+            stats.updated_at: datetime.utcnow(),
+        })
+    )
+
+
+async def get_version(db, movie_id: int):
+    """(version, updated_at) отзывов фильма — один запрос по первичному ключу; (0, None), если отзывов не было"""
+    stats = models.MovieRatingStats
+    row = (await db.execute(select(stats.version, stats.updated_at).where(stats.movie_id == movie_id))).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def to_summary(movie_id: int, stats: Optional[models.MovieRatingStats]) -> dict:
+    if stats is None or not stats.review_count:
+        return {"movie_id": movie_id, "count": 0, "average": None, "histogram": {str(r): 0 for r in RATINGS}}
+    return {
+        "movie_id": movie_id,
+        "count": stats.review_count,
+        "average": round(stats.rating_sum / stats.review_count, 2),
+        "histogram": {str(r): getattr(stats, f"rating_{r}") for r in RATINGS},
+    }
+
+
+async def get_summaries(db, movie_ids: Iterable[int]) -> dict:
+    """Сводки по нескольким фильмам одним запросом по первичному ключу"""
+    movie_ids = list(movie_ids)
+    rows = (await db.scalars(
+        select(models.MovieRatingStats).where(models.MovieRatingStats.movie_id.in_(movie_ids))
+    )).all()
+    by_id = {row.movie_id: row for row in rows}
+    return {movie_id: to_summary(movie_id, by_id.get(movie_id)) for movie_id in movie_ids}
+
+
+def _recomputed_query():
+    review = models.Review
+    columns = [
+        review.movie_id,
+        func.count(review.id).label("review_count"),
+        func.sum(review.rating).label("rating_sum"),
+    ]
+    columns += [func.sum(case((review.rating == r, 1), else_=0)).label(f"rating_{r}") for r in RATINGS]
+    return select(*columns).group_by(review.movie_id)
+
+
+AGGREGATE_FIELDS = ["review_count", "rating_sum"] + [f"rating_{r}" for r in RATINGS]
+
+
+def find_drift(session) -> list:
+    """Фильмы, у которых сохранённые агрегаты расходятся с пересчётом по reviews"""
+    expected = {row.movie_id: row for row in session.execute(_recomputed_query())}
+    stored = {row.movie_id: row for row in session.scalars(select(models.MovieRatingStats))}
+    drift = []
+    for movie_id in sorted(set(expected) | set(stored)):
+        want = expected.get(movie_id)
+        have = stored.get(movie_id)
+        want_values = {f: int(getattr(want, f) or 0) for f in AGGREGATE_FIELDS} if want else None
+        have_values = {f: getattr(have, f) for f in AGGREGATE_FIELDS} if have else None
+        if want_values is None and have_values and not have_values["review_count"]:
+            continue
+        if want_values != have_values:
+            drift.append({"movie_id": movie_id, "expected": want_values, "stored": have_values})
+    return drift
+
+
+def rebuild(session) -> int:
+    """Пересчитать movie_rating_stats с нуля; возвращает число фильмов с отзывами"""
+    stats = models.MovieRatingStats
+    # -- версии не сбрасываем, а увеличиваем: иначе новые ETag могли бы совпасть с закэшированными клиентами
+    versions = dict(session.execute(select(stats.movie_id, stats.version)).all())
+    session.execute(delete(stats))
+    now = datetime.utcnow()
+    rows = {row.movie_id: row for row in session.execute(_recomputed_query())}
+    # -- фильмы, у которых отзывов не осталось, сохраняются с нулевыми счётчиками — вместе с версией
+    session.add_all([
+        stats(movie_id=movie_id, updated_at=now, version=versions.get(movie_id, 0) + 1,
+              **{f: int(getattr(rows.get(movie_id), f, 0) or 0) for f in AGGREGATE_FIELDS})
+        for movie_id in sorted(set(rows) | set(versions))
+    ])
+    session.commit()
+    return len(rows)
+
+
+def main(argv=None):
+    from backend.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--check", action="store_true", help="показать расхождения и выйти с кодом 1, если они есть")
+    group.add_argument("--rebuild", action="store_true", help="пересчитать агрегаты из таблицы reviews")
+    args = parser.parse_args(argv)
+
+    with SessionLocal() as session:
+        drift = find_drift(session)
+        for item in drift:
+            print(f"movie {item['movie_id']}: stored={item['stored']} expected={item['expected']}")
+        print(f"Drifted movies: {len(drift)}")
+        if args.rebuild:
+            count = rebuild(session)
+            print(f"Rebuilt rating stats for {count} movies")
+            return 0
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
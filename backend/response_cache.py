@@ -0,0 +1,168 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import orjson
+
+from backend import compression
+
+TMDB_CACHE_ENABLED = str(os.getenv("TMDB_CACHE_ENABLED", "true")).lower() in ("1", "true", "yes")
+TMDB_CACHE_MAX_ENTRIES = int(os.getenv("TMDB_CACHE_MAX_ENTRIES", "2048"))
+TMDB_CACHE_MAX_BYTES = int(os.getenv("TMDB_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# -- сколько секунд после истечения TTL ещё можно отдавать устаревший ответ, обновляя его в фоне
+TMDB_CACHE_STALE_SECONDS = int(os.getenv("TMDB_CACHE_STALE_SECONDS", "600"))
+
+# -- TTL (в секундах) по эндпоинтам TMDB; переопределяется через TMDB_CACHE_TTL_<ENDPOINT>
+DEFAULT_TTLS = {
+    "popular": 30 * 60,
+    "search": 10 * 60,
+    "genre": 30 * 60,
+    "details": 6 * 60 * 60,
+    "videos": 6 * 60 * 60,
+}
+ENDPOINT_TTLS = {
+    name: int(os.getenv(f"TMDB_CACHE_TTL_{name.upper()}", str(ttl)))
+    for name, ttl in DEFAULT_TTLS.items()
+}
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+def make_key(endpoint: str, path: str, params: Optional[dict] = None) -> str:
+    """Ключ кэша: эндпоинт + путь + отсортированные параметры (включая язык)"""
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    query = "&".join(f"{k}={v}" for k, v in items)
+    return f"{endpoint}:{path}?{query}"
+
+
+class Payload:
+    """Тело ответа TMDB как есть (bytes): отдаётся клиенту без разбора, в dict — только по требованию.
+
+    ETag считается один раз — когда тело получено от TMDB или из L2, а не на каждый запрос;
+    сжатые варианты (gzip / brotli) — один раз при сохранении в кэш (precompress).
+    Разобранный dict не хранится: он в разы больше тела и не учитывался бы в TMDB_CACHE_MAX_BYTES.
+    """
+
+    __slots__ = ("body", "etag", "encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.encoded = {}
+
+    def __len__(self):
+        """Объём в кэше: тело и все сжатые варианты"""
+        return len(self.body) + sum(len(variant) for variant in self.encoded.values())
+
+    def precompress(self, min_size: int = compression.COMPRESS_MIN_SIZE):
+        if len(self.body) < min_size:
+            return
+        self.encoded = {
+            encoding: compression.compress(self.body, encoding, stored=True) for encoding in compression.ENCODINGS
+        }
+
+    def variant(self, accept_encoding: Optional[str]):
+        """(тело, кодировка) по Accept-Encoding; без подходящего сжатого варианта — (body, None)"""
+        encoding = compression.negotiate(accept_encoding, self.encoded)
+        if encoding is None:
+            return self.body, None
+        return self.encoded[encoding], encoding
+
+    @property
+    def data(self):
+        """Новый dict на каждый вызов — вызывающий может его менять, кэш это не затронет"""
+        return orjson.loads(self.body)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    size: int
+    expires_at: float
+    stale_until: float
+
+
+class ResponseCache:
+    """In-memory TTL-кэш ответов TMDB с LRU-вытеснением по числу записей и объёму"""
+
+    def __init__(
+            self,
+            max_entries: int = TMDB_CACHE_MAX_ENTRIES,
+            max_bytes: int = TMDB_CACHE_MAX_BYTES,
+            stale_seconds: int = TMDB_CACHE_STALE_SECONDS,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_seconds = stale_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str):
+        """Вернуть (значение, состояние), где состояние — fresh / stale / miss"""
+        entry = self._entries.get(key)
+        now = self.clock()
+        if entry is None or now >= entry.stale_until:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None, MISS
+
+        self._entries.move_to_end(key)
+        if now < entry.expires_at:
+            self.hits += 1
+            return entry.value, FRESH
+        self.stale_hits += 1
+        return entry.value, STALE
+
+    def set(self, key: str, value, size: int, ttl: int):
+        # -- старое значение убираем до проверки размера: иначе устаревший ответ отдавался бы до конца TTL
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        now = self.clock()
+        self._entries[key] = CacheEntry(
+            value=value,
+            size=size,
+            expires_at=now + ttl,
+            stale_until=now + ttl + self.stale_seconds,
+        )
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,40 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Склейка одновременных одинаковых запросов: в полёте не больше одного вызова на ключ"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        """Выполнить fn() для ключа или дождаться уже идущего вызова с тем же ключом.
+
+        Вызов идёт отдельной задачей, а не в первом вызывающем: отмена любого из
+        ожидающих (в том числе первого) не отменяет общий вызов для остальных.
+        Результат и исключение получают все ожидающие; ничего не сохраняется
+        после завершения вызова, поэтому ошибки не кэшируются.
+        """
+        task = self._inflight.get(key)
+        # -- завершённая задача ждёт только done-callback: новый вызов должен идти заново
+        if task is not None and not task.done():
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.calls += 1
+            task.add_done_callback(lambda done: self._done(key, done))
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # -- помечаем исключение как полученное, даже если все ожидающие ушли
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,132 @@
+import contextvars
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from backend import metrics
+
+logger = logging.getLogger(__name__)
+
+# -- X-Query-Count / X-Query-Time-Ms в ответах (только для отладки, не для продакшена)
+SQL_DEBUG_HEADERS = str(os.getenv("SQL_DEBUG_HEADERS", "false")).lower() in ("1", "true", "yes")
+# -- запросы дольше порога (в секундах) пишутся в лог с нормализованным SQL
+SQL_SLOW_QUERY_SECONDS = float(os.getenv("SQL_SLOW_QUERY_SECONDS", "0.2"))
+
+
+class QueryStats:
+    """Запросы, выполненные в рамках одного HTTP-запроса или блока track_queries()"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: List[str] = []
+
+    def add(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements.append(statement)
+
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("sql_query_stats", default=None)
+# -- трекеры из тестов: запросы идут в другом потоке (TestClient), контекст туда не передаётся
+_trackers: List[QueryStats] = []
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)\s*\)")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL без литералов и с одной строкой: IN (?, ?, ?) -> IN (...), 42 -> ?"""
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _PARAM_LIST.sub("(...)", sql)
+
+
+def instrument_engine(engine):
+    """Считать и замерять запросы синхронного движка (для async — engine.sync_engine).
+
+    Один хук на движок: длительность запроса идёт и в метрики Prometheus, и в QueryStats запроса.
+    """
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["sql_query_start"].pop()
+        metrics.observe_query(statement, duration)
+        stats = _current.get()
+        if stats is not None:
+            stats.add(statement, duration)
+        for tracker in _trackers:
+            tracker.add(statement, duration)
+        if duration >= SQL_SLOW_QUERY_SECONDS:
+            logger.warning("Slow query (%.1f ms): %s", duration * 1000, normalize_sql(statement))
+
+    def handle_error(context):
+        # -- after_cursor_execute при ошибке не вызывается — снимаем отметку времени здесь
+        stack = context.connection.info.get("sql_query_start") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+class QueryCountMiddleware:
+    """ASGI-middleware: собирает запросы к БД за HTTP-запрос и отдаёт их число в заголовках"""
+
+    def __init__(self, app, debug_headers: Optional[bool] = None):
+        self.app = app
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        debug_headers = SQL_DEBUG_HEADERS if self.debug_headers is None else self.debug_headers
+
+        async def send_wrapper(message):
+            if debug_headers and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-query-count", str(stats.count).encode()),
+                    (b"x-query-time-ms", f"{stats.duration * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+
+
+@contextmanager
+def track_queries():
+    """Собрать все запросы к БД внутри блока (в любом потоке)"""
+    stats = QueryStats()
+    _trackers.append(stats)
+    try:
+        yield stats
+    finally:
+        _trackers.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Упасть, если внутри блока выполнено больше limit запросов; в сообщении — их SQL"""
+    with track_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        listing = "\n".join(f"  {normalize_sql(sql)}" for sql in stats.statements)
+        raise AssertionError(f"Expected at most {limit} queries, got {stats.count}:\n{listing}")
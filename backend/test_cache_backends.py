@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend.cache_backends import RedisCacheBackend, SQLiteCacheBackend, build_backend
+from backend.response_cache import ResponseCache
+from backend.tmdb_client import TmdbClient
+
+
+class FakeRedis:
+    """Локальная заглушка Redis: get/set с ex, как у redis.asyncio"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def aclose(self):
+        pass
+
+
+def _counting_handler(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"id": 19995, "title": "Avatar"})
+
+    return handler
+
+
+def _worker(shared, calls):
+    """Отдельный «воркер»: свой L1 и свой HTTP-клиент, общий L2"""
+    return TmdbClient(api_key="k", base_url="https://tmdb.test/3", transport=httpx.MockTransport(_counting_handler(calls)),
+                      cache=ResponseCache(), shared_cache=shared)
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def shared_backend(request, tmp_path):
+    if request.param == "sqlite":
+        return lambda: SQLiteCacheBackend(str(tmp_path / "l2.sqlite3"))
+    fake = FakeRedis()
+    return lambda: RedisCacheBackend(fake)
+
+
+def test_second_worker_reads_from_shared_tier(shared_backend):
+    calls = []
+
+    async def scenario():
+        first = _worker(shared_backend(), calls)
+        second = _worker(shared_backend(), calls)
+        a = await first.fetch("details", "/movie/19995")
+        b = await second.fetch("details", "/movie/19995")
+        c = await second.fetch("details", "/movie/19995")
+        await first.aclose()
+        await second.aclose()
+        return a, b, c, second
+
+    a, b, c, second = asyncio.run(scenario())
+    assert a == b == c == {"id": 19995, "title": "Avatar"}
+    # TMDB вызван один раз, второй воркер получил ответ из L2, а затем из своего L1
+    assert calls == ["/3/movie/19995"]
+    assert second.shared_cache.hits == 1
+    assert second.cache.hits == 1
+
+
+def test_stale_shared_entry_is_served_and_refreshed_from_upstream(tmp_path):
+    calls = []
+
+    async def scenario():
+        shared = SQLiteCacheBackend(str(tmp_path / "l2.sqlite3"))
+        now = time.time()
+        await shared._set("details:/movie/19995?language=ru-RU", b'{"id": 1}', now - 10, now + 600)
+        worker = _worker(shared, calls)
+        stale = await worker.fetch("details", "/movie/19995")
+        await asyncio.gather(*worker._background)
+        fresh = await worker.fetch("details", "/movie/19995")
+        await worker.aclose()
+        return stale, fresh
+
+    stale, fresh = asyncio.run(scenario())
+    assert stale == {"id": 1}
+    assert fresh == {"id": 19995, "title": "Avatar"}
+    assert calls == ["/3/movie/19995"]
+
+
+def test_shared_tier_failures_fall_back_to_upstream():
+    class BrokenRedis(FakeRedis):
+        async def get(self, key):
+            raise ConnectionError("redis is down")
+
+    calls = []
+
+    async def scenario():
+        worker = _worker(RedisCacheBackend(BrokenRedis()), calls)
+        data = await worker.fetch("details", "/movie/19995")
+        await worker.aclose()
+        return worker, data
+
+    worker, data = asyncio.run(scenario())
+    assert data["id"] == 19995
+    assert worker.shared_cache.errors == 1
+
+
+def test_build_backend_from_url(tmp_path):
+    assert build_backend("") is None
+    backend = build_backend(f"sqlite:///{tmp_path / 'cache.db'}")
+    assert isinstance(backend, SQLiteCacheBackend)
+    with pytest.raises(ValueError):
+        build_backend("memcached://localhost")
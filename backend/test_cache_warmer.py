@@ -0,0 +1,155 @@
+import asyncio
+import random
+import sqlite3
+
+import httpx
+
+from backend import models
+from backend.cache_warmer import CacheWarmer, WarmerLock
+from backend.database import AsyncSessionLocal
+from backend.response_cache import ENDPOINT_TTLS, ResponseCache
+from backend.tmdb_client import TmdbClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lock_is_held_by_one_owner(tmp_path):
+    path = str(tmp_path / "warmer.lock")
+    first, second = WarmerLock(path), WarmerLock(path)
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_warmer_prefetches_targets_and_refreshes_before_ttl(db_session, tmp_path):
+    # Пользователи-«зрители» с заведомо большими id, чтобы не пересекаться с другими тестами
+    viewers = range(95000, 95030)
+    db_session.add_all([models.WatchHistory(user_id=user_id, movie_id=555) for user_id in viewers])
+    db_session.add_all([models.WatchHistory(user_id=user_id, movie_id=777) for user_id in viewers[:10]])
+    db_session.add_all([models.Favorite(user_id=user_id, movie_id=777) for user_id in viewers[10:20]])
+    db_session.add(models.Favorite(user_id=viewers[0], movie_id=888))
+    db_session.commit()
+
+    calls = []
+    in_flight = {"now": 0, "max": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        calls.append((request.url.path, request.url.params.get("page"), request.url.params.get("with_genres")))
+        return httpx.Response(200, json={"ok": True})
+
+    clock = FakeClock()
+
+    async def scenario():
+        tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", cache=ResponseCache(),
+                          transport=httpx.MockTransport(handler))
+        warmer = CacheWarmer(tmdb, AsyncSessionLocal, lock=WarmerLock(str(tmp_path / "w.lock")),
+                             popular_pages=3, genres=[28, 35], top_movies=2, concurrency=2,
+                             refresh_fraction=0.8, jitter=0.1, clock=clock, rng=random.Random(1))
+        warmer._replan(await warmer.plan())
+        await warmer.run_once()
+        first_pass = list(calls)
+
+        # Запись в кэше свежая: пользователь получает её без запроса к TMDB
+        await tmdb.fetch("popular", "/movie/popular", {"page": 1})
+        assert len(calls) == len(first_pass)
+
+        # До 0.7 TTL ничего не обновляется, после 0.9 TTL — всё, что прогрето
+        clock.now += ENDPOINT_TTLS["popular"] * 0.7
+        await warmer.run_once()
+        assert len(calls) == len(first_pass)
+        clock.now += ENDPOINT_TTLS["details"]
+        await warmer.run_once()
+        await tmdb.aclose()
+        return first_pass, calls[len(first_pass):]
+
+    try:
+        first_pass, second_pass = asyncio.run(scenario())
+    finally:
+        db_session.query(models.WatchHistory).filter(models.WatchHistory.user_id.in_(viewers)).delete()
+        db_session.query(models.Favorite).filter(models.Favorite.user_id.in_(viewers)).delete()
+        db_session.commit()
+    assert sorted(first_pass) == sorted([
+        ("/3/movie/popular", "1", None), ("/3/movie/popular", "2", None), ("/3/movie/popular", "3", None),
+        ("/3/discover/movie", "1", "28"), ("/3/discover/movie", "1", "35"),
+        # Топ по истории и избранному: 555 (30 раз), 777 (20 раз); 888 не попадает в top_movies=2
+        ("/3/movie/555", None, None), ("/3/movie/777", None, None),
+    ])
+    assert sorted(second_pass) == sorted(first_pass)
+    assert in_flight["max"] <= 2
+
+
+
+class FlakyTmdb:
+    """refresh падает не-HTTP ошибкой (как сбой записи в L2) для первой популярной страницы"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def refresh(self, endpoint, path, params=None):
+        self.calls.append((path, params.get("page")))
+        if params.get("page") == 1:
+            raise sqlite3.OperationalError("database is locked")
+
+
+def test_warmer_survives_non_http_errors(tmp_path):
+    clock = FakeClock()
+
+    async def scenario():
+        tmdb = FlakyTmdb()
+        warmer = CacheWarmer(tmdb, AsyncSessionLocal, lock=WarmerLock(str(tmp_path / "w.lock")),
+                             popular_pages=2, genres=[], top_movies=0, retry_seconds=60, jitter=0, clock=clock)
+        task = asyncio.create_task(warmer.run())
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(tmdb.calls) == 2:
+                break
+        # Ошибка одной цели не завершила цикл: остальные обновлены, упавшая — повторится позже
+        alive = not task.done()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return warmer, tmdb, alive
+
+    warmer, tmdb, alive = asyncio.run(scenario())
+    assert alive
+    assert sorted(tmdb.calls) == [("/movie/popular", 1), ("/movie/popular", 2)]
+    assert (warmer.refreshed, warmer.failed) == (1, 1)
+    failed = [due for target, due in warmer.due.items() if dict(target.params)["page"] == 1]
+    assert failed == [clock.now + 60]
+    assert not warmer.lock.held
+
+
+def test_waiting_worker_takes_over_lock_quickly(tmp_path):
+    path = str(tmp_path / "w.lock")
+    owner = WarmerLock(path)
+    assert owner.acquire()
+
+    async def scenario():
+        tmdb = FlakyTmdb()
+        warmer = CacheWarmer(tmdb, AsyncSessionLocal, lock=WarmerLock(path), popular_pages=1, genres=[],
+                             top_movies=0, plan_interval=600, lock_retry_seconds=0.01)
+        task = asyncio.create_task(warmer.run())
+        await asyncio.sleep(0.05)
+        assert tmdb.calls == []
+        # Воркер с блокировкой завершился — второй перехватывает прогрев, не дожидаясь plan_interval
+        owner.release()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if tmdb.calls:
+                break
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return tmdb
+
+    assert asyncio.run(scenario()).calls == [("/movie/popular", 1)]
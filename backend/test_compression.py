@@ -0,0 +1,73 @@
+import gzip
+import json
+
+import brotli
+import httpx
+
+from backend import compression, main
+from backend.response_cache import ResponseCache
+from backend.test_reviews_and_movies import _seed_reviews
+from backend.tmdb_client import TmdbClient
+
+
+def test_negotiate_respects_q_values_and_server_preference():
+    assert compression.negotiate("gzip, deflate, br") == "br"
+    assert compression.negotiate("gzip") == "gzip"
+    assert compression.negotiate("br;q=0.5, gzip;q=0.8") == "gzip"
+    assert compression.negotiate("br;q=0, *") == "gzip"
+    assert compression.negotiate("identity") is None
+    assert compression.negotiate(None) is None
+
+
+def test_tmdb_payload_is_compressed_once_and_served_by_accept_encoding(client, monkeypatch):
+    body = json.dumps({"results": [{"id": i, "overview": "Описание фильма " * 5} for i in range(100)]}).encode()
+    tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", cache=ResponseCache(),
+                      transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body)))
+    monkeypatch.setattr(main, "tmdb", tmdb)
+    calls = []
+    original = compression.compress
+
+    def counting_compress(body, encoding, stored=False):
+        calls.append(encoding)
+        return original(body, encoding, stored)
+
+    monkeypatch.setattr(compression, "compress", counting_compress)
+
+    responses = {}
+    for accept in ("br", "gzip", "identity", "br"):
+        r = client.get("/api/movies/popular", headers={"Accept-Encoding": accept})
+        assert r.status_code == 200
+        assert r.content == body
+        assert r.headers["vary"] == "Accept-Encoding"
+        responses[accept] = r
+
+    # Оба варианта посчитаны один раз — при записи в кэш, а не на каждый ответ
+    assert sorted(calls) == ["br", "gzip"]
+    assert responses["br"].headers["content-encoding"] == "br"
+    assert responses["gzip"].headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in responses["identity"].headers
+    assert int(responses["br"].headers["content-length"]) < len(body) // 3
+
+    etag = responses["br"].headers["etag"]
+    assert etag.endswith('-br"') and etag != responses["identity"].headers["etag"]
+    r = client.get("/api/movies/popular", headers={"Accept-Encoding": "br", "If-None-Match": etag})
+    assert r.status_code == 304
+
+
+def test_dynamic_responses_are_compressed_above_threshold(client, db_session):
+    _seed_reviews(db_session, movie_id=9301, count=30)
+
+    # Без автоматической распаковки httpx, чтобы увидеть сжатые байты
+    with client.stream("GET", "/api/reviews/9301", params={"limit": 50}, headers={"Accept-Encoding": "gzip"}) as r:
+        raw = b"".join(r.iter_raw())
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["etag"].endswith('-gzip"')
+    assert len(json.loads(gzip.decompress(raw))["items"]) == 30
+
+    with client.stream("GET", "/api/reviews/9301", params={"limit": 50}, headers={"Accept-Encoding": "br"}) as r:
+        raw = b"".join(r.iter_raw())
+    assert r.headers["content-encoding"] == "br"
+    assert len(json.loads(brotli.decompress(raw))["items"]) == 30
+
+    small = client.get("/api/movies/9301/rating", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
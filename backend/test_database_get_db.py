@@ -1,23 +1,26 @@
-import pytest
+import asyncio
 from unittest.mock import MagicMock, patch
-import sys
 
+from backend import database
 
-def test_database_get_db_closes_session():
-    if "database" in sys.modules:
-        del sys.modules["database"]
 
+def test_database_get_db_closes_session():
     fake_session = MagicMock()
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = fake_session
 
-    with patch("database.SessionLocal", return_value=fake_session):
-        import database
-
+    async def scenario():
         generator = database.get_db()
-
-        db = next(generator)
+        db = await generator.__anext__()
         assert db is fake_session
+        await generator.aclose()
+
+    with patch("backend.database.AsyncSessionLocal", factory):
+        asyncio.run(scenario())
+
+    factory.return_value.__aexit__.assert_called_once()
 
-        with pytest.raises(StopIteration):
-            next(generator)
 
-    fake_session.close.assert_called_once()
+def test_async_url_uses_async_drivers():
+    assert database.to_async_url("postgresql://u:p@db:5432/watch") == "postgresql+asyncpg://u:p@db:5432/watch"
+    assert database.to_async_url("sqlite:///./test_watch.db") == "sqlite+aiosqlite:///./test_watch.db"
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from backend.db_pool import PoolTelemetry, instrumented_pool, pool_options
+
+
+def test_pool_options_only_size_server_pools():
+    telemetry = PoolTelemetry("test")
+    sqlite_options = pool_options("sqlite:///./x.db", telemetry)
+    assert "pool_size" not in sqlite_options
+    assert "pool_pre_ping" in sqlite_options
+
+    pg_options = pool_options("postgresql+asyncpg://u:p@db/watch", telemetry, is_async=True)
+    assert pg_options["poolclass"].__name__ == "InstrumentedAsyncAdaptedQueuePool"
+    assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle"} <= set(pg_options)
+
+
+def test_pool_telemetry_counts_checkouts_overflow_and_timeouts(tmp_path):
+    telemetry = PoolTelemetry("test")
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool(QueuePool, telemetry),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    telemetry.attach(engine)
+
+    first = engine.connect()
+    second = engine.connect()  # сверх pool_size — overflow
+    first.execute(text("SELECT 1"))
+    assert telemetry.checked_out == 2
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    first.close()
+    second.close()
+
+    stats = telemetry.stats()
+    assert stats["checkouts"] == 2
+    assert stats["checked_out"] == 0
+    assert stats["max_checked_out"] == 2
+    assert stats["overflow_events"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.05
+    engine.dispose()
+
+
+def test_db_pool_endpoint(client):
+    r = client.get("/api/db/pool")
+    assert r.status_code == 200
+    assert {"status", "checkouts", "checked_out", "wait_seconds_avg"} <= set(r.json())
@@ -22,7 +22,7 @@ def test_add_and_get_and_delete_favorites(client, db_session):
     # Изначально избранное пустое
     r_empty = client.get("/api/favorites", headers={"Authorization": f"Bearer {token}"})
     assert r_empty.status_code == 200
-    assert r_empty.json() == []
+    assert r_empty.json() == {"items": [], "next_cursor": None}
 
     # Добавляем фильм в избранное
     movie_id = 12345
@@ -46,7 +46,7 @@ def test_add_and_get_and_delete_favorites(client, db_session):
     # Проверяем, что в GET /api/favorites вернулся наш фильм
     r_list = client.get("/api/favorites", headers={"Authorization": f"Bearer {token}"})
     assert r_list.status_code == 200
-    favorites = r_list.json()
+    favorites = r_list.json()["items"]
     assert len(favorites) == 1
     assert favorites[0]["movie_id"] == movie_id
 
@@ -73,7 +73,7 @@ def test_watch_history_add_update_and_limit(client, db_session):
     # Изначально пусто
     r_empty = client.get("/api/history", headers={"Authorization": f"Bearer {token}"})
     assert r_empty.status_code == 200
-    assert r_empty.json() == []
+    assert r_empty.json() == {"items": [], "next_cursor": None}
 
     # Добавляем 5 разных фильмов
     for i in range(1, 6):
@@ -86,7 +86,7 @@ def test_watch_history_add_update_and_limit(client, db_session):
 
     r_list = client.get("/api/history", headers={"Authorization": f"Bearer {token}"})
     assert r_list.status_code == 200
-    history = r_list.json()
+    history = r_list.json()["items"]
     assert len(history) == 5
     # Последний добавленный (movie_id=5) должен быть первым в истории
     assert history[0]["movie_id"] == 5
@@ -101,7 +101,7 @@ def test_watch_history_add_update_and_limit(client, db_session):
     assert r_update.json()["message"] in ("Updated watch history", "Updated watch history")
 
     r_list2 = client.get("/api/history", headers={"Authorization": f"Bearer {token}"})
-    history2 = r_list2.json()
+    history2 = r_list2.json()["items"]
     # movie_id=3 должен стать первым
     assert history2[0]["movie_id"] == 3
 
@@ -114,8 +114,154 @@ def test_watch_history_add_update_and_limit(client, db_session):
     assert r_new.status_code == 200
 
     r_list3 = client.get("/api/history", headers={"Authorization": f"Bearer {token}"})
-    history3 = r_list3.json()
+    history3 = r_list3.json()["items"]
     assert len(history3) == 5
     # Убеждаемся, что нет самого старого фильма (movie_id=1)
     movie_ids = [item["movie_id"] for item in history3]
     assert 1 not in movie_ids
+
+
+def test_dashboard_returns_profile_with_movie_summaries(monkeypatch, client):
+    import httpx
+    from backend.tmdb_client import TmdbClient
+
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        movie_id = int(request.url.path.rsplit("/", 1)[-1])
+        calls.append(movie_id)
+        return httpx.Response(200, json={
+            "id": movie_id,
+            "title": f"Movie {movie_id}",
+            "poster_path": f"/p{movie_id}.jpg",
+            "vote_average": 7.5,
+            "overview": "длинное описание",
+            "genres": [{"id": 1, "name": "Драма"}],
+            "release_date": "2009-12-10",
+        })
+
+    monkeypatch.setattr(main, "tmdb", TmdbClient(api_key="test-tmdb-key", transport=httpx.MockTransport(handler)))
+
+    token = _register_and_get_token(client, username="dashuser", email="dash@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/api/favorites", json={"movie_id": 10}, headers=headers)
+    client.post("/api/history", json={"movie_id": 10}, headers=headers)
+    client.post("/api/history", json={"movie_id": 20}, headers=headers)
+    client.post("/api/reviews", json={"movie_id": 20, "rating": 9, "comment": "Супер"}, headers=headers)
+
+    r = client.get("/api/me/dashboard", headers=headers)
+    assert r.status_code == 200
+    data = r.json()
+
+    assert data["user"]["username"] == "dashuser"
+    assert [f["movie_id"] for f in data["favorites"]["items"]] == [10]
+    assert [h["movie_id"] for h in data["history"]["items"]] == [20, 10]
+    assert data["reviews"]["items"][0]["rating"] == 9
+    assert data["reviews"]["items"][0]["movie"] == {"id": 20, "title": "Movie 20", "poster_path": "/p20.jpg",
+                                                    "vote_average": 7.5, "release_date": "2009-12-10",
+                                                    "genres": [{"id": 1, "name": "Драма"}]}
+    # Только поля карточек профиля, без описания и прочего документа TMDB
+    assert set(data["favorites"]["items"][0]["movie"]) == {"id", "title", "poster_path", "vote_average",
+                                                          "release_date", "genres"}
+    assert data["favorites"]["next_cursor"] is None
+    # Каждый фильм запрошен в TMDB один раз, даже если встречается в нескольких разделах
+    assert sorted(calls) == [10, 20]
+
+
+def test_dashboard_requires_auth(client):
+    r = client.get("/api/me/dashboard")
+    assert r.status_code in (401, 403)
+
+
+
+def test_dashboard_cursors_continue_on_section_endpoints(monkeypatch, client, db_session):
+    import httpx
+    from backend.tmdb_client import TmdbClient
+
+    monkeypatch.setattr(main, "tmdb", TmdbClient(api_key="test-tmdb-key", transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json={"id": int(request.url.path.rsplit("/", 1)[-1])}))))
+    token = _register_and_get_token(client, username="moreuser", email="more@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    user = db_session.query(models.User).filter(models.User.username == "moreuser").first()
+    base = datetime(2024, 1, 1)
+    db_session.add_all(
+        [models.Favorite(user_id=user.id, movie_id=3000 + i, added_at=base + timedelta(minutes=i)) for i in range(25)]
+        + [models.WatchHistory(user_id=user.id, movie_id=3000 + i, watched_at=base + timedelta(minutes=i))
+           for i in range(25)]
+        + [models.Review(user_id=user.id, movie_id=3000 + i, rating=5, comment="ok",
+                         created_at=base + timedelta(minutes=i)) for i in range(25)]
+    )
+    db_session.commit()
+
+    dashboard = client.get("/api/me/dashboard", headers=headers).json()
+    # Профиль догружает остальное по next_cursor дашборда из постраничных эндпоинтов разделов
+    for section, path in (("favorites", "/api/favorites"), ("history", "/api/history"),
+                          ("reviews", f"/api/users/{user.id}/reviews")):
+        first = dashboard[section]
+        assert len(first["items"]) == 20
+        rest = client.get(path, params={"cursor": first["next_cursor"]}, headers=headers).json()
+        seen = [item["movie_id"] for item in first["items"] + rest["items"]]
+        assert seen == [3000 + i for i in reversed(range(25))], section
+        assert rest["next_cursor"] is None
+
+def test_favorites_are_paginated_and_filterable(client, db_session):
+    token = _register_and_get_token(client, username="pageuser", email="page@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    user = db_session.query(models.User).filter(models.User.username == "pageuser").first()
+    base = datetime(2024, 1, 1)
+    # Одинаковое время у части записей — порядок внутри определяется id
+    db_session.add_all([
+        models.Favorite(user_id=user.id, movie_id=1000 + i, added_at=base + timedelta(minutes=i // 3))
+        for i in range(12)
+    ])
+    db_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 5}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/favorites", params=params, headers=headers).json()
+        seen.extend(item["movie_id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [1000 + i for i in reversed(range(12))]
+
+    only = client.get("/api/favorites", params={"movie_id": 1005}, headers=headers).json()
+    assert [item["movie_id"] for item in only["items"]] == [1005]
+
+
+def test_user_reviews_are_paginated(client, db_session):
+    token = _register_and_get_token(client, username="pagereviewer", email="pagereviewer@example.com")
+    user = db_session.query(models.User).filter(models.User.username == "pagereviewer").first()
+    db_session.add_all([
+        models.Review(user_id=user.id, movie_id=2000 + i, rating=5, comment="ok") for i in range(7)
+    ])
+    db_session.commit()
+
+    first = client.get(f"/api/users/{user.id}/reviews", params={"limit": 4}).json()
+    second = client.get(f"/api/users/{user.id}/reviews", params={"limit": 4, "cursor": first["next_cursor"]}).json()
+    assert len(first["items"]) == 4
+    assert len(second["items"]) == 3
+    assert second["next_cursor"] is None
+    ids = [item["id"] for item in first["items"] + second["items"]]
+    assert len(set(ids)) == 7
+
+
+def test_history_depth_is_configurable_and_trim_is_set_based(client, monkeypatch, query_tracker):
+    monkeypatch.setattr(main, "HISTORY_DEPTH", 3)
+    token = _register_and_get_token(client, username="depthuser", email="depth@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    counts = []
+    for movie_id in range(3000, 3008):
+        with query_tracker() as queries:
+            assert client.post("/api/history", json={"movie_id": movie_id}, headers=headers).status_code == 200
+        counts.append(queries.count)
+
+    # Число запросов не растёт вместе с историей
+    assert len(set(counts)) == 1
+    items = client.get("/api/history", headers=headers).json()["items"]
+    assert [item["movie_id"] for item in items] == [3007, 3006, 3005]
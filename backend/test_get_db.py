@@ -1,23 +1,21 @@
-import pytest
+import asyncio
 from unittest.mock import MagicMock, patch
-import sys
 
+from backend import main
 
-def test_get_db_finally_closes_connection():
-    if "main" in sys.modules:
-        del sys.modules["main"]
 
+def test_get_db_finally_closes_connection():
     fake_session = MagicMock()
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = fake_session
 
-    with patch("main.SessionLocal", return_value=fake_session):
-        import main
-
+    async def scenario():
         generator = main.get_db()
-
-        db = next(generator)
+        db = await generator.__anext__()
         assert db is fake_session
+        await generator.aclose()
 
-        with pytest.raises(StopIteration):
-            next(generator)
+    with patch("backend.main.AsyncSessionLocal", factory):
+        asyncio.run(scenario())
 
-    fake_session.close.assert_called_once()
+    factory.return_value.__aexit__.assert_called_once()
@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import httpx
+
+from backend import http_cache, main
+from backend.response_cache import ResponseCache
+from backend.test_reviews_and_movies import register_user_and_token
+from backend.tmdb_client import TmdbClient
+
+
+def test_is_not_modified_rules():
+    etag = http_cache.make_etag("reviews", 1, 3)
+    assert http_cache.is_not_modified(etag, etag)
+    assert http_cache.is_not_modified(etag, f'"other", W/{etag}')
+    assert http_cache.is_not_modified(etag, "*")
+    assert not http_cache.is_not_modified(etag, '"other"')
+
+    modified = datetime(2024, 5, 1, 12, 0, 0, 500000)
+    assert http_cache.is_not_modified(etag, None, modified, "Wed, 01 May 2024 12:00:00 GMT")
+    assert not http_cache.is_not_modified(etag, None, modified, "Wed, 01 May 2024 11:59:59 GMT")
+    # If-None-Match важнее If-Modified-Since
+    assert not http_cache.is_not_modified(etag, '"other"', modified, "Wed, 01 May 2024 12:00:00 GMT")
+
+
+
+def test_if_modified_since_accepts_obsolete_date_formats():
+    etag = http_cache.make_etag("rating", 1, 3)
+    modified = datetime(1994, 11, 6, 8, 49, 37)
+    # asctime, RFC 850 и "-0000" дают время без часового пояса — это тоже GMT
+    for value in ("Sun Nov  6 08:49:37 1994", "Sunday, 06-Nov-94 08:49:37 GMT", "Sun, 06 Nov 1994 08:49:37 -0000"):
+        assert http_cache.is_not_modified(etag, None, modified, value), value
+    assert not http_cache.is_not_modified(etag, None, modified, "Sun Nov  6 08:49:36 1994")
+
+
+def test_rating_route_accepts_asctime_if_modified_since(client):
+    token = register_user_and_token(client, username="imsuser", email="ims@example.com")
+    client.post("/api/reviews", json={"movie_id": 7200, "rating": 7, "comment": "Неплохо"},
+                headers={"Authorization": f"Bearer {token}"})
+    response = client.get("/api/movies/7200/rating", headers={"If-Modified-Since": "Sun Nov  6 08:49:37 1994"})
+    assert response.status_code == 200
+
+def test_tmdb_routes_answer_304_for_matching_etag(client, monkeypatch):
+    tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", cache=ResponseCache(),
+                      transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"id": 5})))
+    monkeypatch.setattr(main, "tmdb", tmdb)
+
+    first = client.get("/api/movies/5")
+    assert first.status_code == 200
+    assert "stale-while-revalidate" in first.headers["cache-control"]
+    etag = first.headers["etag"]
+
+    again = client.get("/api/movies/5", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+    assert client.get("/api/movies/5", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_reviews_etag_changes_on_write_and_304_skips_page_query(client, assert_max_queries):
+    token = register_user_and_token(client, username="etaguser", email="etag@example.com")
+    auth = {"Authorization": f"Bearer {token}"}
+
+    empty = client.get("/api/reviews/7100")
+    assert empty.status_code == 200
+
+    client.post("/api/reviews", json={"movie_id": 7100, "rating": 8, "comment": "Хорошо"}, headers=auth)
+    first = client.get("/api/reviews/7100")
+    assert first.headers["etag"] != empty.headers["etag"]
+    assert "last-modified" in first.headers
+
+    # Совпадение ETag: только запрос версии, без чтения страницы
+    with assert_max_queries(1):
+        again = client.get("/api/reviews/7100", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+
+    # Другие параметры страницы — другое представление
+    assert client.get("/api/reviews/7100", params={"limit": 5},
+                      headers={"If-None-Match": first.headers["etag"]}).status_code == 200
+
+    # Смена имени автора меняет отзывы фильма
+    r = client.put("/api/auth/update", json={"display_name": "Новое имя"}, headers=auth)
+    assert r.status_code == 200
+    renamed = client.get("/api/reviews/7100", headers={"If-None-Match": first.headers["etag"]})
+    assert renamed.status_code == 200
+    assert renamed.json()["items"][0]["user"]["username"] == "Новое имя"
+
+    rating = client.get("/api/movies/7100/rating")
+    assert client.get("/api/movies/7100/rating", headers={"If-None-Match": rating.headers["etag"]}).status_code == 304
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import httpx
+
+from backend import main
+from backend.test_reviews_and_movies import _tmdb_handler
+from backend.tmdb_client import TmdbClient
+
+
+def _sample(text, name, **labels):
+    """Значение ряда из текстового вывода /metrics (или None)"""
+    for line in text.splitlines():
+        if line.startswith(f"{name}{{") and all(f'{k}="{v}"' in line for k, v in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_metrics_endpoint_reports_routes_tmdb_and_db(monkeypatch, client):
+    monkeypatch.setattr(main, "tmdb", TmdbClient(api_key="test-tmdb-key", transport=httpx.MockTransport(_tmdb_handler)))
+
+    client.get("/api/movies/777")
+    client.get("/api/movies/777")
+    client.get("/api/reviews/777")
+    client.get("/definitely/not/a/route")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+
+    # Метка — шаблон маршрута, а не конкретный путь
+    assert _sample(text, "http_requests_total", route="/api/movies/{movie_id}", status="200") >= 2
+    assert _sample(text, "http_requests_total", route="unmatched", status="404") >= 1
+    assert _sample(text, "http_request_duration_seconds_count", route="/api/reviews/{movie_id}") >= 1
+    assert _sample(text, "tmdb_upstream_duration_seconds_count", endpoint="details") >= 1
+    assert _sample(text, "tmdb_cache_lookups_total", layer="l1", result="fresh") >= 1
+    assert _sample(text, "db_queries_total", operation="SELECT") >= 1
+
+
+CHILD = """
+import sys
+from backend import metrics
+metrics.HTTP_REQUESTS.labels("GET", "/x", "200").inc(int(sys.argv[1]))
+"""
+
+READER = """
+from backend import metrics
+body, _ = metrics.render()
+print(body.decode())
+"""
+
+
+def test_metrics_aggregate_across_worker_processes(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for count in (2, 3):
+        subprocess.run([sys.executable, "-c", CHILD, str(count)], env=env, check=True)
+    out = subprocess.run([sys.executable, "-c", READER], env=env, check=True, capture_output=True, text=True).stdout
+    assert _sample(out, "http_requests_total", route="/x", status="200") == 5.0
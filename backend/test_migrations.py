@@ -0,0 +1,73 @@
+from sqlalchemy import create_engine, inspect, text
+
+from backend.migrations import migrate
+
+
+def test_migrate_adds_missing_indexes_to_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    # Схема «старой» БД: таблицы есть, составных индексов нет
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL, "
+                          "display_name VARCHAR, email VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL, "
+                          "avatar_url VARCHAR, created_at DATETIME)"))
+        conn.execute(text("CREATE TABLE favorites (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                          "movie_id INTEGER NOT NULL, added_at DATETIME)"))
+        conn.execute(text("CREATE TABLE reviews (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                          "movie_id INTEGER NOT NULL, rating INTEGER NOT NULL, comment TEXT, created_at DATETIME)"))
+        conn.execute(text("CREATE TABLE watch_history (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                          "movie_id INTEGER NOT NULL, watched_at DATETIME)"))
+
+    migrate(engine)
+    # Повторный запуск ничего не ломает
+    migrate(engine)
+
+    inspector = inspect(engine)
+    review_indexes = {ix["name"] for ix in inspector.get_indexes("reviews")}
+    assert {"ix_reviews_movie_created", "ix_reviews_user_created"} <= review_indexes
+    assert "ix_favorites_user_added" in {ix["name"] for ix in inspector.get_indexes("favorites")}
+    assert "ix_watch_history_user_watched" in {ix["name"] for ix in inspector.get_indexes("watch_history")}
+
+
+def test_migrate_dedupes_before_creating_unique_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'dupes.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE favorites (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                          "movie_id INTEGER NOT NULL, added_at DATETIME)"))
+        conn.execute(text("CREATE TABLE reviews (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                          "movie_id INTEGER NOT NULL, rating INTEGER NOT NULL, comment TEXT, created_at DATETIME)"))
+        conn.execute(text("CREATE TABLE watch_history (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                          "movie_id INTEGER NOT NULL, watched_at DATETIME)"))
+        conn.execute(text("INSERT INTO favorites (id, user_id, movie_id) VALUES (1, 1, 10), (2, 1, 10), (3, 1, 11)"))
+        conn.execute(text("INSERT INTO reviews (id, user_id, movie_id, rating) VALUES (1, 1, 10, 8), (2, 1, 10, 2)"))
+        conn.execute(text("INSERT INTO watch_history (id, user_id, movie_id) VALUES (1, 1, 10), (2, 1, 10)"))
+
+    migrate(engine)
+
+    with engine.connect() as conn:
+        assert [r[0] for r in conn.execute(text("SELECT id FROM favorites ORDER BY id"))] == [1, 3]
+        assert [r[0] for r in conn.execute(text("SELECT id FROM reviews"))] == [1]
+        # В истории остаётся последняя запись
+        assert [r[0] for r in conn.execute(text("SELECT id FROM watch_history"))] == [2]
+        stats = conn.execute(text("SELECT review_count, rating_sum FROM movie_rating_stats WHERE movie_id = 10")).one()
+        assert tuple(stats) == (1, 8)
+
+    inspector = inspect(engine)
+    unique = {ix["name"] for table in ("favorites", "reviews", "watch_history")
+              for ix in inspector.get_indexes(table) if ix["unique"]}
+    assert unique == {"ux_favorites_user_movie", "ux_reviews_user_movie", "ux_watch_history_user_movie"}
+
+
+def test_migrate_adds_new_columns_to_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'columns.db'}")
+    with engine.begin() as conn:
+        # Таблица агрегатов до появления колонки version
+        histogram = ", ".join(f"rating_{r} INTEGER NOT NULL DEFAULT 0" for r in range(1, 11))
+        conn.execute(text(f"CREATE TABLE movie_rating_stats (movie_id INTEGER PRIMARY KEY, "
+                          f"review_count INTEGER NOT NULL, rating_sum INTEGER NOT NULL, {histogram}, "
+                          f"updated_at DATETIME)"))
+        conn.execute(text("INSERT INTO movie_rating_stats (movie_id, review_count, rating_sum) VALUES (1, 0, 0)"))
+
+    migrate(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM movie_rating_stats WHERE movie_id = 1")).scalar() == 0
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from backend import main
+from backend.passwords import PasswordHasher, PasswordHasherBusy
+
+
+def test_hasher_runs_bcrypt_off_the_event_loop():
+    hasher = PasswordHasher(workers=2, max_queue=4)
+
+    async def scenario():
+        ticks = []
+
+        async def ticker():
+            # Пока bcrypt работает в пуле, event loop продолжает обслуживать другие задачи
+            for _ in range(20):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        hashed, _ = await asyncio.gather(hasher.hash("secret123"), ticker())
+        ok = await hasher.verify("secret123", hashed)
+        bad = await hasher.verify("wrong", hashed)
+        gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+        return ok, bad, max(gaps)
+
+    try:
+        ok, bad, max_gap = asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+    assert ok is True
+    assert bad is False
+    assert max_gap < 0.1
+
+
+def test_hasher_rejects_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+
+    async def scenario():
+        return await asyncio.gather(*[hasher.hash("secret123") for _ in range(4)], return_exceptions=True)
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        hasher.shutdown()
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 2
+    assert sum(isinstance(r, str) for r in results) == 2
+    assert hasher.rejected == 2
+    assert hasher.pending == 0
+
+
+def test_register_returns_503_when_hashing_queue_is_full(monkeypatch, client):
+    busy = PasswordHasher(workers=1, max_queue=0)
+    busy.pending = 1
+    monkeypatch.setattr(main, "password_hasher", busy)
+
+    r = client.post("/api/auth/register", json={
+        "username": "busyuser",
+        "email": "busy@example.com",
+        "password": "BusyPass123!",
+    })
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
@@ -0,0 +1,62 @@
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.profiling import ProfilingMiddleware, make_token, verify_token
+
+
+def _busy_handler():
+    deadline = time.perf_counter() + 0.05
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+def _app(tmp_path, **options):
+    app = FastAPI()
+
+    @app.get("/busy")
+    async def busy():
+        return {"total": _busy_handler()}
+
+    app.add_middleware(ProfilingMiddleware, spool_dir=str(tmp_path), interval=0.001, **options)
+    return app
+
+
+def test_token_signature_and_expiry():
+    token = make_token("s3cret", ttl=60)
+    assert verify_token(token, "s3cret")
+    assert not verify_token(token, "other")
+    assert not verify_token(make_token("s3cret", ttl=-10), "s3cret")
+    assert not verify_token("garbage", "s3cret")
+    assert not verify_token(token, "")
+
+
+def test_signed_header_writes_folded_profile(tmp_path):
+    client = TestClient(_app(tmp_path, secret="s3cret", sample_rate=0))
+
+    plain = client.get("/busy")
+    assert "x-profile-file" not in plain.headers
+    forged = client.get("/busy", headers={"X-Profile": make_token("wrong")})
+    assert "x-profile-file" not in forged.headers
+    assert os.listdir(tmp_path) == []
+
+    r = client.get("/busy", headers={"X-Profile": make_token("s3cret")})
+    assert r.status_code == 200
+    filename = r.headers["x-profile-file"]
+    lines = (tmp_path / filename).read_text(encoding="utf-8").splitlines()
+    assert lines
+    # Формат folded stacks: "кадр;кадр;кадр число"
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("_busy_handler" in line for line in lines)
+
+
+def test_sampling_rate_and_retention(tmp_path):
+    client = TestClient(_app(tmp_path, sample_rate=1.0, max_files=2))
+    for _ in range(4):
+        assert "x-profile-file" in client.get("/busy").headers
+    assert len(os.listdir(tmp_path)) == 2
@@ -0,0 +1,94 @@
+from backend import models, rating_stats
+from backend.test_reviews_and_movies import register_user_and_token
+
+
+def _review(client, token, movie_id, rating):
+    r = client.post(
+        "/api/reviews",
+        json={"movie_id": movie_id, "rating": rating, "comment": "ok"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert r.status_code == 200
+    return r.json()["id"]
+
+
+def test_rating_summary_follows_created_and_deleted_reviews(client):
+    movie_id = 4401
+    empty = client.get(f"/api/movies/{movie_id}/rating").json()
+    assert empty["count"] == 0
+    assert empty["average"] is None
+
+    first = register_user_and_token(client, username="rater1", email="rater1@example.com")
+    second = register_user_and_token(client, username="rater2", email="rater2@example.com")
+    review_id = _review(client, first, movie_id, 9)
+    _review(client, second, movie_id, 6)
+
+    r = client.get(f"/api/movies/{movie_id}/rating")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["count"] == 2
+    assert data["average"] == 7.5
+    assert data["histogram"]["9"] == 1
+    assert data["histogram"]["6"] == 1
+    assert sum(data["histogram"].values()) == 2
+
+    r_del = client.delete(f"/api/reviews/{review_id}", headers={"Authorization": f"Bearer {first}"})
+    assert r_del.status_code == 200
+
+    data = client.get(f"/api/movies/{movie_id}/rating").json()
+    assert data["count"] == 1
+    assert data["average"] == 6.0
+    assert data["histogram"]["9"] == 0
+
+
+def test_ratings_batch_keeps_order(client):
+    token = register_user_and_token(client, username="rater3", email="rater3@example.com")
+    _review(client, token, 4402, 10)
+
+    r = client.get("/api/movies/ratings", params={"ids": "4403,4402,4403"})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [item["movie_id"] for item in results] == [4403, 4402]
+    assert results[0]["count"] == 0
+    assert results[1]["average"] == 10.0
+
+    assert client.get("/api/movies/ratings", params={"ids": "1,x"}).status_code == 400
+
+
+def test_rebuild_fixes_drift(client, db_session):
+    token = register_user_and_token(client, username="rater4", email="rater4@example.com")
+    _review(client, token, 4404, 4)
+
+    # Портим агрегат вручную — проверка должна это заметить, пересчёт — исправить
+    stats = db_session.get(models.MovieRatingStats, 4404)
+    stats.review_count = 5
+    db_session.commit()
+
+    assert 4404 in {item["movie_id"] for item in rating_stats.find_drift(db_session)}
+    rating_stats.rebuild(db_session)
+    assert rating_stats.find_drift(db_session) == []
+
+    data = client.get("/api/movies/4404/rating").json()
+    assert data["count"] == 1
+    assert data["average"] == 4.0
+
+
+
+def test_rebuild_keeps_etag_versions_increasing(client, db_session):
+    token = register_user_and_token(client, username="rater5", email="rater5@example.com")
+    _review(client, token, 4405, 6)
+    _review(client, token, 4406, 7)
+    other = register_user_and_token(client, username="rater6", email="rater6@example.com")
+    gone = _review(client, other, 4406, 9)
+    client.delete(f"/api/reviews/{gone}", headers={"Authorization": f"Bearer {other}"})
+    before = {movie_id: db_session.get(models.MovieRatingStats, movie_id).version for movie_id in (4405, 4406)}
+    etag = client.get("/api/movies/4405/rating").headers["etag"]
+
+    rating_stats.rebuild(db_session)
+    db_session.expire_all()
+
+    # Версия после пересчёта больше прежней — ETag не может повторить уже выданный клиенту
+    for movie_id, version in before.items():
+        assert db_session.get(models.MovieRatingStats, movie_id).version == version + 1
+    assert client.get("/api/movies/4405/rating", headers={"If-None-Match": etag}).status_code == 200
+    assert rating_stats.find_drift(db_session) == []
@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+
+from backend.response_cache import FRESH, MISS, STALE, ResponseCache, make_key
+from backend.tmdb_client import TmdbClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_depends_on_endpoint_and_params():
+    a = make_key("popular", "/movie/popular", {"page": 1, "language": "ru-RU"})
+    b = make_key("popular", "/movie/popular", {"language": "ru-RU", "page": 1})
+    c = make_key("popular", "/movie/popular", {"language": "en-US", "page": 1})
+    assert a == b
+    assert a != c
+
+
+def test_cache_ttl_and_stale_window():
+    clock = FakeClock()
+    cache = ResponseCache(max_entries=10, max_bytes=1000, stale_seconds=30, clock=clock)
+    cache.set("k", {"v": 1}, size=10, ttl=60)
+
+    assert cache.get("k") == ({"v": 1}, FRESH)
+    clock.now += 61
+    assert cache.get("k") == ({"v": 1}, STALE)
+    clock.now += 30
+    assert cache.get("k") == (None, MISS)
+    assert len(cache) == 0
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["stale_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_cache_lru_eviction_by_entries_and_bytes():
+    cache = ResponseCache(max_entries=2, max_bytes=100, stale_seconds=0)
+    cache.set("a", 1, size=10, ttl=60)
+    cache.set("b", 2, size=10, ttl=60)
+    cache.get("a")  # "a" становится самым свежим
+    cache.set("c", 3, size=10, ttl=60)
+    assert cache.get("b")[1] == MISS
+    assert cache.get("a")[1] == FRESH
+
+    cache.set("big", 4, size=95, ttl=60)
+    assert len(cache) == 1
+    assert cache.total_bytes == 95
+    assert cache.evictions == 3
+
+    # Запись больше лимита не кэшируется вовсе
+    cache.set("huge", 5, size=1000, ttl=60)
+    assert cache.get("huge")[1] == MISS
+
+    # Новое значение больше лимита вытесняет старое по тому же ключу, а не оставляет его в кэше
+    cache.set("big", 6, size=1000, ttl=60)
+    assert cache.get("big")[1] == MISS
+    assert cache.total_bytes == 0
+
+
+def test_tmdb_fetch_serves_hot_movie_from_cache():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"id": 76600})
+
+    async def scenario():
+        tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", transport=httpx.MockTransport(handler),
+                          cache=ResponseCache())
+        results = [await tmdb.fetch("details", "/movie/76600") for _ in range(50)]
+        await tmdb.aclose()
+        return tmdb, results
+
+    tmdb, results = asyncio.run(scenario())
+    assert all(r == {"id": 76600} for r in results)
+    assert calls == ["/3/movie/76600"]
+    assert tmdb.cache.stats()["hits"] == 49
+
+
+def test_cached_payload_keeps_only_bytes():
+    async def scenario():
+        tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", cache=ResponseCache(),
+                          transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"id": 1})))
+        first = await tmdb.fetch("details", "/movie/1")
+        first["title"] = "изменено вызывающим"
+        second = await tmdb.fetch("details", "/movie/1")
+        await tmdb.aclose()
+        return tmdb, second
+
+    tmdb, second = asyncio.run(scenario())
+    # Разобранный dict не держится в L1 (его нет в учёте объёма) и не разделяется между вызовами
+    assert second == {"id": 1}
+    payload, _ = tmdb.cache.get(make_key("details", "/movie/1", {"language": tmdb.language}))
+    assert not hasattr(payload, "_data")
+    assert tmdb.cache.total_bytes == len(payload)
+
+
+def test_tmdb_fetch_revalidates_stale_entry_in_background():
+    clock = FakeClock()
+    version = {"n": 1}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"version": version["n"]})
+
+    async def scenario():
+        cache = ResponseCache(stale_seconds=600, clock=clock)
+        tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", transport=httpx.MockTransport(handler),
+                          cache=cache)
+        first = await tmdb.fetch("popular", "/movie/popular", {"page": 1})
+        clock.now += 31 * 60
+        version["n"] = 2
+        stale = await tmdb.fetch("popular", "/movie/popular", {"page": 1})
+        # Дожидаемся фонового обновления
+        await asyncio.gather(*tmdb._background)
+        fresh = await tmdb.fetch("popular", "/movie/popular", {"page": 1})
+        await tmdb.aclose()
+        return first, stale, fresh
+
+    first, stale, fresh = asyncio.run(scenario())
+    assert first == {"version": 1}
+    assert stale == {"version": 1}
+    assert fresh == {"version": 2}
+
+
+def test_movie_routes_pass_tmdb_body_through_unchanged(client, monkeypatch):
+    from backend import main
+
+    body = b'{"id": 76600,  "title": "\xd0\x90\xd0\xb2\xd0\xb0\xd1\x82\xd0\xb0\xd1\x80"}'
+    tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", cache=ResponseCache(),
+                      transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body)))
+    monkeypatch.setattr(main, "tmdb", tmdb)
+
+    for _ in range(2):
+        r = client.get("/api/movies/76600")
+        assert r.status_code == 200
+        assert r.headers["content-type"] == "application/json"
+        # Байты TMDB без повторной сериализации (лишние пробелы сохранены)
+        assert r.content == body
+    assert tmdb.cache.stats()["hits"] == 1
+    assert asyncio.run(tmdb.fetch("details", "/movie/76600"))["title"] == "Аватар"
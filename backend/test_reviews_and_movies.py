@@ -1,7 +1,7 @@
 
-import types
 import httpx
 from backend import models, main, database
+from backend.tmdb_client import TmdbClient
 
 
 def register_user_and_token(client, username="reviewer", email="review@example.com"):
@@ -49,7 +49,7 @@ def test_create_and_get_reviews(client, db_session):
     # Получаем список отзывов для фильма
     r_list = client.get(f"/api/reviews/{movie_id}")
     assert r_list.status_code == 200
-    reviews = r_list.json()
+    reviews = r_list.json()["items"]
     assert len(reviews) == 1
     assert reviews[0]["rating"] == 8
     assert reviews[0]["comment"] == "Очень хороший фильм"
@@ -61,7 +61,7 @@ def test_create_and_get_reviews(client, db_session):
 
     r_user_reviews = client.get(f"/api/users/{user.id}/reviews")
     assert r_user_reviews.status_code == 200
-    user_reviews = r_user_reviews.json()
+    user_reviews = r_user_reviews.json()["items"]
     assert len(user_reviews) == 1
     assert user_reviews[0]["movie_id"] == movie_id
 
@@ -69,52 +69,25 @@ def test_create_and_get_reviews(client, db_session):
 # --------------------- TMDB endpoints (мок httpx.AsyncClient) ---------------------
 
 
-class DummyResponse:
-    def __init__(self, data, status_code: int = 200):
-        self._data = data
-        self.status_code = status_code
-
-    def json(self):
-        return self._data
-
-    def raise_for_status(self):
-        if self.status_code >= 400:
-            raise httpx.HTTPError(f"HTTP error {self.status_code}")
-
-
-class DummyAsyncClient:
-    def __init__(self, *args, **kwargs):
-        self.last_requests = []
-
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(self, exc_type, exc, tb):
-        pass
-
-    async def get(self, url, params=None):
-        # Сохраним запрос для проверки при необходимости
-        self.last_requests.append((url, params))
-        # Возвращаем фиксированный JSON
-        if "popular" in url:
-            return DummyResponse({"results": [{"id": 1, "title": "Popular Movie"}]})
-        elif "search" in url:
-            return DummyResponse({"results": [{"id": 2, "title": "Search Result"}]})
-        elif "videos" in url:
-            return DummyResponse({"results": [{"id": "abc", "key": "trailer_key"}]})
-        else:  # /movie/{id}
-            return DummyResponse({"id": 42, "title": "Some Movie"})
+def _tmdb_handler(request: httpx.Request) -> httpx.Response:
+    # Возвращаем фиксированный JSON в зависимости от пути запроса
+    url = str(request.url)
+    if "popular" in url:
+        return httpx.Response(200, json={"results": [{"id": 1, "title": "Popular Movie"}]})
+    elif "search" in url:
+        return httpx.Response(200, json={"results": [{"id": 2, "title": "Search Result"}]})
+    elif "videos" in url:
+        return httpx.Response(200, json={"results": [{"id": "abc", "key": "trailer_key"}]})
+    else:  # /movie/{id}
+        return httpx.Response(200, json={"id": 42, "title": "Some Movie"})
 
 
 def _patch_httpx_for_main(monkeypatch):
     """
-    Подменяем main.httpx на свой namespace с DummyAsyncClient.
+    Подменяем клиент TMDB в main на клиент с MockTransport.
     """
-    fake_httpx = types.SimpleNamespace(
-        AsyncClient=DummyAsyncClient,
-        HTTPError=httpx.HTTPError,
-    )
-    monkeypatch.setattr(main, "httpx", fake_httpx)
+    fake_tmdb = TmdbClient(api_key="test-tmdb-key", transport=httpx.MockTransport(_tmdb_handler))
+    monkeypatch.setattr(main, "tmdb", fake_tmdb)
 
 
 def test_root_endpoint(client):
@@ -160,3 +133,110 @@ def test_get_movie_videos_uses_tmdb(monkeypatch, client):
     data = r.json()
     assert "results" in data
     assert data["results"][0]["key"] == "trailer_key"
+
+
+def _batch_handler(request: httpx.Request) -> httpx.Response:
+    movie_id = int(request.url.path.rsplit("/", 1)[-1])
+    if movie_id == 404:
+        return httpx.Response(404, json={"status_message": "not found"})
+    return httpx.Response(200, json={"id": movie_id, "title": f"Movie {movie_id}"})
+
+
+def test_movies_batch_keeps_order_and_reports_errors(monkeypatch, client):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return _batch_handler(request)
+
+    monkeypatch.setattr(main, "tmdb", TmdbClient(api_key="test-tmdb-key", transport=httpx.MockTransport(handler)))
+
+    r = client.get("/api/movies/batch", params={"ids": "3,404,1,3"})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [item["id"] for item in results] == [3, 404, 1, 3]
+    assert results[0]["movie"]["title"] == "Movie 3"
+    assert "error" in results[1]
+    assert results[3]["movie"]["title"] == "Movie 3"
+    # Повторяющийся id запрошен в TMDB один раз
+    assert len(calls) == 3
+
+    # Уже закэшированные фильмы не идут в TMDB повторно
+    r_post = client.post("/api/movies/batch", json={"ids": [1, 3]})
+    assert r_post.status_code == 200
+    assert [item["movie"]["id"] for item in r_post.json()["results"]] == [1, 3]
+    assert len(calls) == 3
+
+
+def test_movies_batch_reports_malformed_tmdb_body_per_id(monkeypatch, client):
+    def handler(request):
+        if request.url.path.endswith("/500"):
+            return httpx.Response(200, content=b"<html>Bad Gateway</html>")
+        return _batch_handler(request)
+
+    monkeypatch.setattr(main, "tmdb", TmdbClient(api_key="test-tmdb-key", transport=httpx.MockTransport(handler)))
+
+    r = client.get("/api/movies/batch", params={"ids": "1,500"})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert results[0]["movie"]["title"] == "Movie 1"
+    assert results[1] == {"id": 500, "error": "Malformed TMDB response"}
+
+
+def test_movies_batch_validates_ids(monkeypatch, client):
+    monkeypatch.setattr(main, "MOVIE_BATCH_MAX_IDS", 2)
+
+    assert client.get("/api/movies/batch", params={"ids": "1,abc"}).status_code == 400
+    assert client.post("/api/movies/batch", json={"ids": [1, 2, 3]}).status_code == 400
+
+
+def _seed_reviews(db_session, movie_id, count):
+    users = [
+        models.User(username=f"rv{movie_id}_{i}", email=f"rv{movie_id}_{i}@example.com", hashed_password="x")
+        for i in range(count)
+    ]
+    db_session.add_all(users)
+    db_session.flush()
+    db_session.add_all([
+        models.Review(user_id=user.id, movie_id=movie_id, rating=(i % 10) + 1, comment=f"review {i}")
+        for i, user in enumerate(users)
+    ])
+    db_session.commit()
+
+
+def test_movie_reviews_query_count_does_not_depend_on_review_count(client, db_session, assert_max_queries):
+    _seed_reviews(db_session, movie_id=9001, count=3)
+    _seed_reviews(db_session, movie_id=9002, count=40)
+
+    for movie_id in (9001, 9002):
+        # Версия отзывов фильма (для ETag) + одна страница с авторами
+        with assert_max_queries(2):
+            r = client.get(f"/api/reviews/{movie_id}", params={"limit": 50})
+        assert r.status_code == 200
+
+
+def test_movie_reviews_are_paginated_with_cursor(client, db_session):
+    _seed_reviews(db_session, movie_id=9003, count=25)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/api/reviews/9003", params=params)
+        assert r.status_code == 200
+        data = r.json()
+        seen.extend(item["id"] for item in data["items"])
+        pages += 1
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 25
+    assert seen == sorted(seen, reverse=True)
+    assert all("username" in item["user"] for item in data["items"])
+
+    assert client.get("/api/reviews/9003", params={"cursor": "not-a-cursor"}).status_code == 400
@@ -0,0 +1,143 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.response_cache import ResponseCache
+from backend.singleflight import SingleFlight
+from backend.tmdb_client import TmdbClient
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": 42}
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*[flight.do("movie:42", upstream) for _ in range(100)])
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(r == {"id": 42} for r in results)
+    assert flight.coalesced == 99
+    assert len(flight) == 0
+
+
+def test_errors_propagate_to_all_waiters_and_are_not_cached():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        calls.append(1)
+        return "ok"
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*[flight.do("k", failing) for _ in range(10)], return_exceptions=True)
+        # После ошибки следующий вызов снова идёт в upstream
+        retry = await flight.do("k", ok)
+        return results, retry
+
+    results, retry = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retry == "ok"
+    assert len(calls) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        flight = SingleFlight()
+        leader = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_cancelled_first_caller_does_not_fail_waiters():
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        flight = SingleFlight()
+        leader = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flight.do("k", slow)) for _ in range(5)]
+        await asyncio.sleep(0)
+        # Первый вызывающий ушёл (клиент отключился) — общий вызов продолжается
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        results = await asyncio.gather(*waiters)
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert results == ["done"] * 5
+    assert len(calls) == 1
+    assert len(flight) == 0
+
+
+@pytest.mark.parametrize("cache", [ResponseCache(), None])
+def test_tmdb_fetch_coalesces_thundering_herd(cache):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"results": [{"id": 1}]})
+
+    async def scenario():
+        tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", transport=httpx.MockTransport(handler),
+                          cache=cache)
+        results = await asyncio.gather(*[tmdb.fetch("popular", "/movie/popular", {"page": 1}) for _ in range(200)])
+        await tmdb.aclose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(r == {"results": [{"id": 1}]} for r in results)
+
+
+def test_tmdb_fetch_does_not_cache_upstream_errors():
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return httpx.Response(503)
+
+    async def scenario():
+        tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", transport=httpx.MockTransport(handler),
+                          cache=ResponseCache())
+        results = await asyncio.gather(*[tmdb.fetch("details", "/movie/7") for _ in range(20)],
+                                       return_exceptions=True)
+        with pytest.raises(httpx.HTTPError):
+            await tmdb.fetch("details", "/movie/7")
+        await tmdb.aclose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, httpx.HTTPError) for r in results)
+    assert len(calls) == 2
@@ -0,0 +1,60 @@
+import logging
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from backend import sql_instrumentation
+from backend.sql_instrumentation import normalize_sql, track_queries
+
+
+def test_normalize_sql_strips_literals_and_collapses_lists():
+    sql = """SELECT id FROM reviews
+             WHERE movie_id IN (?, ?, ?) AND comment = 'it''s' AND rating > 7"""
+    assert normalize_sql(sql) == "SELECT id FROM reviews WHERE movie_id IN (...) AND comment = ? AND rating > ?"
+    assert normalize_sql("SELECT rating_10 FROM movie_rating_stats WHERE movie_id = $1") == \
+        "SELECT rating_10 FROM movie_rating_stats WHERE movie_id = $1"
+
+
+def test_slow_queries_are_logged_and_counted(monkeypatch, caplog):
+    engine = create_engine("sqlite://")
+    sql_instrumentation.instrument_engine(engine)
+    monkeypatch.setattr(sql_instrumentation, "SQL_SLOW_QUERY_SECONDS", 0.0)
+
+    with caplog.at_level(logging.WARNING, logger="backend.sql_instrumentation"):
+        with track_queries() as queries:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1 WHERE 'x' = 'x'"))
+                conn.execute(text("SELECT 2"))
+    assert queries.count == 2
+    assert "SELECT ? WHERE ? = ?" in caplog.text
+
+
+def test_one_cursor_hook_feeds_metrics_and_query_stats():
+    engine = create_engine("sqlite://")
+    sql_instrumentation.instrument_engine(engine)
+    # Метрики Prometheus и счётчик запросов — из одной пары слушателей курсора
+    assert len(list(engine.dispatch.after_cursor_execute)) == 1
+
+    before = REGISTRY.get_sample_value("db_queries_total", {"operation": "SELECT"}) or 0
+    with track_queries() as queries:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    assert queries.count == 1
+    assert REGISTRY.get_sample_value("db_queries_total", {"operation": "SELECT"}) == before + 1
+
+
+def test_assert_max_queries_reports_statements(client, assert_max_queries):
+    with pytest.raises(AssertionError, match="Expected at most 0 queries"):
+        with assert_max_queries(0):
+            client.get("/api/reviews/1")
+
+
+def test_query_count_header_in_debug_mode(client, monkeypatch):
+    assert "x-query-count" not in client.get("/api/movies/1/rating").headers
+
+    monkeypatch.setattr(sql_instrumentation, "SQL_DEBUG_HEADERS", True)
+    r = client.get("/api/movies/1/rating")
+    assert r.status_code == 200
+    assert r.headers["x-query-count"] == "1"
+    assert float(r.headers["x-query-time-ms"]) >= 0
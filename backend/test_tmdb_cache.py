@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend import tmdb_client
+from backend.tmdb_cache import CACHE_DIR, FixtureStore, FixtureTransport, build_transport, fixture_key
+from backend.tmdb_client import TmdbClient
+from bench.tmdb_stub import StubConfig, create_app
+
+
+def _client(transport: FixtureTransport) -> TmdbClient:
+    return TmdbClient(api_key="k", base_url="http://tmdb.test/3", transport=transport)
+
+
+def test_fixture_key_covers_whole_request():
+    key = fixture_key("/search/movie", {"query": "Avatar ", "page": 1, "language": "ru-RU", "api_key": "a"})
+    assert key == fixture_key("/search/movie", {"language": "ru-RU", "page": "1", "query": "avatar"})
+    assert key != fixture_key("/search/movie", {"language": "ru-RU", "page": "2", "query": "avatar"})
+    assert key != fixture_key("/search/movie", {"language": "en-US", "page": "1", "query": "avatar"})
+    assert key != fixture_key("/search/movie", {"language": "ru-RU", "page": "1", "query": "matrix"})
+
+
+def test_replay_serves_named_fixtures_by_request():
+    store = FixtureStore()
+    assert store.load_dir(CACHE_DIR) == 5
+    transport = FixtureTransport(store, base_url="http://tmdb.test/3")
+
+    async def scenario():
+        tmdb = _client(transport)
+        try:
+            search = await tmdb.get_json("/search/movie", {"query": "Avatar", "page": 1})
+            movie = await tmdb.get_json("/movie/19995")
+            with pytest.raises(httpx.HTTPStatusError):
+                await tmdb.get_json("/search/movie", {"query": "matrix", "page": 1})
+            return search, movie
+        finally:
+            await tmdb.aclose()
+
+    search, movie = asyncio.run(scenario())
+    with open(CACHE_DIR / "search_avatar.json", encoding="utf-8") as f:
+        assert search == json.load(f)
+    assert movie["id"] == 19995
+
+
+def test_record_then_replay_from_dir_and_bundle(tmp_path):
+    upstream = httpx.ASGITransport(app=create_app(StubConfig(seed=1)))
+    record_dir = tmp_path / "fixtures"
+    requests = [
+        ("/movie/popular", {"page": 3}),
+        ("/search/movie", {"query": "matrix", "page": 1}),
+        ("/discover/movie", {"page": 1, "with_genres": 28, "sort_by": "popularity.desc"}),
+        ("/movie/550", None),
+        ("/movie/550/videos", None),
+    ]
+
+    async def run(transport):
+        tmdb = _client(transport)
+        try:
+            return [await tmdb.get_json(path, params) for path, params in requests]
+        finally:
+            await tmdb.aclose()
+
+    recorded = asyncio.run(run(FixtureTransport(FixtureStore(), "http://tmdb.test/3", upstream, record_dir)))
+    assert len(list(record_dir.glob("*.json"))) == 5
+
+    store = FixtureStore()
+    store.load_dir(record_dir)
+    assert asyncio.run(run(FixtureTransport(store, "http://tmdb.test/3"))) == recorded
+
+    store.write_bundle(tmp_path / "fixtures.bin")
+    bundled = FixtureStore()
+    assert bundled.load_bundle(tmp_path / "fixtures.bin") == 5
+    assert asyncio.run(run(FixtureTransport(bundled, "http://tmdb.test/3"))) == recorded
+
+
+
+def test_record_mode_uses_client_pool_settings(monkeypatch, tmp_path):
+    monkeypatch.setenv("TMDB_FIXTURES", "record")
+    monkeypatch.setenv("TMDB_FIXTURE_DIR", str(tmp_path))
+    monkeypatch.setattr(tmdb_client, "TMDB_MAX_CONNECTIONS", 7)
+    monkeypatch.setattr(tmdb_client, "TMDB_MAX_KEEPALIVE", 3)
+
+    pool = build_transport().upstream._pool
+    assert (pool._max_connections, pool._max_keepalive_connections) == (7, 3)
+    assert pool._keepalive_expiry == tmdb_client.TMDB_KEEPALIVE_EXPIRY
+    assert pool._http2 == tmdb_client.use_http2()
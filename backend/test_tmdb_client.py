@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend.tmdb_client import TmdbClient
+
+
+def test_tmdb_client_reuses_connection_pool_and_merges_params():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json={"ok": True})
+
+    async def scenario():
+        tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", transport=httpx.MockTransport(handler))
+        await tmdb.start()
+        first_client = tmdb.client
+        data = await tmdb.get_json("/movie/popular", {"page": 2})
+        await tmdb.get_json("/movie/42")
+        # Один и тот же httpx.AsyncClient на все запросы
+        assert tmdb.client is first_client
+        await tmdb.aclose()
+        return data
+
+    data = asyncio.run(scenario())
+    assert data == {"ok": True}
+    assert seen[0].url.path == "/3/movie/popular"
+    assert seen[0].url.params["api_key"] == "k"
+    assert seen[0].url.params["language"] == "ru-RU"
+    assert seen[0].url.params["page"] == "2"
+    assert seen[1].url.path == "/3/movie/42"
+
+
+def test_tmdb_client_raises_http_error_on_bad_status():
+    transport = httpx.MockTransport(lambda request: httpx.Response(404, json={"status_message": "nope"}))
+
+    async def scenario():
+        tmdb = TmdbClient(api_key="k", base_url="https://tmdb.test/3", transport=transport)
+        try:
+            await tmdb.get_json("/movie/1")
+        finally:
+            await tmdb.aclose()
+
+    with pytest.raises(httpx.HTTPError):
+        asyncio.run(scenario())
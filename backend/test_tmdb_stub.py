@@ -0,0 +1,102 @@
+import asyncio
+import importlib
+import json
+import random
+import time
+
+import httpx
+import pytest
+
+import bench.tmdb_stub
+from backend.tmdb_client import TmdbClient
+from bench.tmdb_stub import FIXTURES_DIR, StubConfig, create_app, parse_latency
+
+
+def _client(config: StubConfig) -> TmdbClient:
+    return TmdbClient(api_key="k", base_url="http://tmdb-stub/3", transport=httpx.ASGITransport(app=create_app(config)))
+
+
+def test_stub_serves_recorded_fixtures_and_synthetic_movies():
+    async def scenario():
+        tmdb = _client(StubConfig(seed=1))
+        try:
+            return (
+                await tmdb.get_json("/movie/popular", {"page": 1}),
+                await tmdb.get_json("/movie/popular", {"page": 7}),
+                await tmdb.get_json("/search/movie", {"query": "Avatar"}),
+                await tmdb.get_json("/discover/movie", {"with_genres": 28, "page": 2}),
+                await tmdb.get_json("/movie/19995"),
+                await tmdb.get_json("/movie/123456"),
+                await tmdb.get_json("/movie/123456/videos"),
+            )
+        finally:
+            await tmdb.aclose()
+
+    popular, popular_7, search, discover, recorded, synthetic, videos = asyncio.run(scenario())
+    assert popular["results"] and popular["page"] == 1
+    assert popular_7["page"] == 7 and len(popular_7["results"]) == 20
+    with open(FIXTURES_DIR / "search_avatar.json", encoding="utf-8") as f:
+        assert search == json.load(f)
+    assert discover["page"] == 2
+    assert recorded["id"] == 19995
+    assert synthetic == {**synthetic, "id": 123456, "title": "Movie 123456"}
+    assert videos["results"][0]["type"] == "Trailer"
+
+
+def test_stub_injects_errors():
+    config = StubConfig(error_rate=1.0, error_status=503, seed=1)
+
+    async def scenario():
+        tmdb = _client(config)
+        try:
+            await tmdb.get_json("/movie/1")
+        finally:
+            await tmdb.aclose()
+
+    with pytest.raises(httpx.HTTPStatusError) as exc:
+        asyncio.run(scenario())
+    assert exc.value.response.status_code == 503
+    assert config.stats["errors"] == 1
+
+
+def test_stub_timeouts_and_latency():
+    timeouts = StubConfig(timeout_rate=1.0, timeout_seconds=0.2, seed=1)
+    slow = StubConfig(latency="fixed:50", seed=1)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=create_app(timeouts))
+        async with httpx.AsyncClient(transport=transport, base_url="http://tmdb-stub/3") as client:
+            timed_out = await client.get("/movie/1")
+        tmdb = _client(slow)
+        started = time.perf_counter()
+        await tmdb.get_json("/movie/1")
+        elapsed = time.perf_counter() - started
+        await tmdb.aclose()
+        return timed_out, elapsed
+
+    timed_out, elapsed = asyncio.run(scenario())
+    assert timed_out.status_code == 504 and timeouts.stats["timeouts"] == 1
+    assert elapsed >= 0.05
+
+
+def test_parse_latency():
+    rng = random.Random(1)
+    assert parse_latency("", rng)() == 0
+    assert parse_latency("fixed:20", rng)() == 0.02
+    assert 0.01 <= parse_latency("uniform:10,30", rng)() <= 0.03
+    assert parse_latency("lognormal:40,0.5", rng)() > 0
+    with pytest.raises(ValueError):
+        parse_latency("normal:1", rng)
+
+
+
+def test_cli_seed_defaults_to_env(monkeypatch):
+    monkeypatch.setenv("TMDB_STUB_SEED", "7")
+    stub = importlib.reload(bench.tmdb_stub)
+    try:
+        # Без --seed CLI (и docker-compose) берёт TMDB_STUB_SEED, как и StubConfig
+        assert stub.parse_args([]).seed == stub.StubConfig().seed == 7
+        assert stub.parse_args(["--seed", "3"]).seed == 3
+    finally:
+        monkeypatch.delenv("TMDB_STUB_SEED")
+        importlib.reload(bench.tmdb_stub)
@@ -0,0 +1,60 @@
+from backend.test_reviews_and_movies import register_user_and_token
+from backend.user_cache import UserCache, UserSnapshot
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _snapshot(user_id=1, name="alice"):
+    return UserSnapshot(id=user_id, username=name, display_name=name, email=f"{name}@example.com", avatar_url=None)
+
+
+def test_user_cache_ttl_and_key_by_iat():
+    clock = FakeClock()
+    cache = UserCache(ttl=30, max_entries=10, clock=clock)
+    cache.set(100, _snapshot())
+
+    assert cache.get(1, 100).username == "alice"
+    # Другой токен того же пользователя — отдельная запись
+    assert cache.get(1, 200) is None
+    clock.now += 31
+    assert cache.get(1, 100) is None
+    assert len(cache) == 0
+
+
+def test_user_cache_invalidate_and_eviction():
+    cache = UserCache(ttl=30, max_entries=2, clock=FakeClock())
+    cache.set(100, _snapshot(1))
+    cache.set(200, _snapshot(1))
+    cache.set(100, _snapshot(2, "bob"))
+    assert len(cache) == 2
+    assert cache.get(1, 100) is None
+
+    cache.invalidate(1)
+    assert cache.get(1, 200) is None
+    assert cache.get(2, 100).username == "bob"
+
+    disabled = UserCache(ttl=0)
+    disabled.set(100, _snapshot())
+    assert len(disabled) == 0
+
+
+def test_me_is_served_from_cache_and_invalidated_by_update(client, query_tracker):
+    token = register_user_and_token(client, username="cacheduser", email="cached@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/auth/me", headers=headers).json()["display_name"] == "cacheduser"
+
+    with query_tracker() as queries:
+        r = client.get("/api/auth/me", headers=headers)
+        client.get("/api/favorites", headers=headers)
+    assert r.status_code == 200
+    assert not [sql for sql in queries.statements if "FROM users" in sql]
+
+    r_update = client.put("/api/auth/update", json={"display_name": "Renamed"}, headers=headers)
+    assert r_update.status_code == 200
+    assert client.get("/api/auth/me", headers=headers).json()["display_name"] == "Renamed"
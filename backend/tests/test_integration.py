@@ -3,7 +3,7 @@ from fastapi.testclient import TestClient
 
 # Импорт приложения и зависимостей
 from backend.main import app, get_db
-from backend.database import SessionLocal
+from backend.database import AsyncSessionLocal
 from backend import models
 
 
@@ -13,12 +13,9 @@ def step(name: str):
 
 
 # Переопределяем зависимость get_db -> SQLite session
-def override_get_db():
-    db = SessionLocal()
-    try:
+async def override_get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 app.dependency_overrides = {}
@@ -88,7 +85,7 @@ def test_full_integration_scenario():
     print("Status:", r.status_code)
     print("Response:", r.json())
     assert r.status_code == 200
-    assert len(r.json()) == 1
+    assert len(r.json()["items"]) == 1
 
     # 6. Добавление просмотра в историю
     step("6. Добавление просмотра в историю")
@@ -103,7 +100,7 @@ def test_full_integration_scenario():
     print("Status:", r.status_code)
     print("Response:", r.json())
     assert r.status_code == 200
-    assert len(r.json()) == 1
+    assert len(r.json()["items"]) == 1
 
     # 8. Создание отзыва
     step("8. Создание отзыва")
@@ -123,5 +120,5 @@ def test_full_integration_scenario():
     print("Status:", r.status_code)
     print("Response:", r.json())
     assert r.status_code == 200
-    assert len(r.json()) == 1
+    assert len(r.json()["items"]) == 1
 
@@ -1,11 +1,217 @@
-import json
-from pathlib import Path
-
-CACHE_DIR = Path(__file__).parent / "cache" / "tmdb"
-
-def load_cache(name: str):
-    file_path = CACHE_DIR / name
-    if file_path.exists():
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
+"""
+Запись и воспроизведение ответов TMDB (record/replay) для тестов и нагрузки без сети.
+
+Ключ фикстуры — хэш всего запроса: путь, query, page, language и прочие параметры
+(api_key не учитывается). Режим задаётся TMDB_FIXTURES:
+
+    replay — ответы только из фикстур, загруженных в память при старте; промах -> 404
+    record — запросы идут в TMDB (или в заглушку по TMDB_BASE_URL), ответы сохраняются в TMDB_FIXTURE_DIR
+
+USE_TMDB_CACHE=true по-прежнему включает replay. Файлы movie_{id}.json, popular_page_{n}.json и
+search_{query}.json из каталога фикстур подхватываются под соответствующими ключами.
+
+Вместо каталога можно собрать один файл-бандл, который читается через mmap:
+
+    python -m backend.tmdb_cache --bundle fixtures.bin   # затем TMDB_FIXTURE_BUNDLE=fixtures.bin
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import httpx
+
+from backend.tmdb_client import TMDB_BASE_URL, TMDB_LANGUAGE, pool_limits, use_http2
+
+CACHE_DIR = Path(__file__).parent / "cache" / "tmdb"
+
+BUNDLE_MAGIC = b"TMDBFIX1"
+_HEADER = struct.Struct("<8sI")
+
+_LEGACY_NAMES = [
+    (re.compile(r"movie_(\d+)"), lambda m: (f"/movie/{m.group(1)}", {})),
+    (re.compile(r"popular_page_(\d+)"), lambda m: ("/movie/popular", {"page": m.group(1)})),
+    (re.compile(r"search_(.+)"), lambda m: ("/search/movie", {"query": m.group(1), "page": "1"})),
+]
+_KEY_NAME = re.compile(r"[0-9a-f]{64}")
+
+
+def fixture_key(path: str, params: Optional[dict] = None) -> str:
+    """Ключ фикстуры: sha256 от пути и отсортированных параметров запроса без api_key"""
+    canonical = {}
+    for name, value in (params or {}).items():
+        if name == "api_key":
+            continue
+        value = str(value)
+        # -- поиск TMDB не зависит от регистра и пробелов по краям
+        canonical[name] = value.strip().lower() if name == "query" else value
+    raw = json.dumps([path, sorted(canonical.items())], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """Тела ответов TMDB по ключу фикстуры; всё в памяти (или в mmap бандла)"""
+
+    def __init__(self):
+        self._bodies: Dict[str, Union[bytes, memoryview]] = {}
+        self._mmap: Optional[mmap.mmap] = None
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def get(self, key: str) -> Optional[bytes]:
+        body = self._bodies.get(key)
+        return bytes(body) if isinstance(body, memoryview) else body
+
+    def put(self, key: str, body: bytes):
+        self._bodies[key] = body
+
+    def items(self):
+        return ((key, self.get(key)) for key in self._bodies)
+
+    def load_dir(self, directory: Path, language: str = TMDB_LANGUAGE) -> int:
+        """Загрузить все *.json каталога: файлы <ключ>.json и именованные (movie_{id}.json и т.п.)"""
+        loaded = 0
+        for file_path in sorted(Path(directory).glob("*.json")):
+            key = self._key_for_name(file_path.stem, language)
+            if key is None:
+                continue
+            self._bodies[key] = file_path.read_bytes()
+            loaded += 1
+        return loaded
+
+    @staticmethod
+    def _key_for_name(stem: str, language: str) -> Optional[str]:
+        if _KEY_NAME.fullmatch(stem):
+            return stem
+        for pattern, request in _LEGACY_NAMES:
+            match = pattern.fullmatch(stem)
+            if match:
+                path, params = request(match)
+                return fixture_key(path, {"language": language, **params})
+        return None
+
+    def load_bundle(self, bundle_path: Path) -> int:
+        """Подключить бандл через mmap: в память читается только индекс, тела — по требованию"""
+        with open(bundle_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(f"{bundle_path} is not a TMDB fixture bundle")
+        data_start = _HEADER.size + index_size
+        index = json.loads(self._mmap[_HEADER.size:data_start])
+        view = memoryview(self._mmap)
+        # -- смещения в индексе — от начала секции тел
+        for key, (offset, size) in index.items():
+            self._bodies[key] = view[data_start + offset:data_start + offset + size]
+        return len(index)
+
+    def write_bundle(self, bundle_path: Path):
+        """Сохранить все фикстуры в один файл: заголовок, JSON-индекс {ключ: [смещение, длина]}, тела подряд"""
+        bodies = dict(self.items())
+        index, offset = {}, 0
+        for key, body in bodies.items():
+            index[key] = [offset, len(body)]
+            offset += len(body)
+        raw_index = json.dumps(index).encode()
+        with open(bundle_path, "wb") as f:
+            f.write(_HEADER.pack(BUNDLE_MAGIC, len(raw_index)))
+            f.write(raw_index)
+            for body in bodies.values():
+                f.write(body)
+
+
+class FixtureTransport(httpx.AsyncBaseTransport):
+    """Транспорт httpx для TmdbClient: отдаёт фикстуры (replay) или записывает ответы upstream (record)"""
+
+    def __init__(
+            self,
+            store: FixtureStore,
+            base_url: str = TMDB_BASE_URL,
+            upstream: Optional[httpx.AsyncBaseTransport] = None,
+            record_dir: Optional[Path] = None,
+    ):
+        self.store = store
+        self.base_path = httpx.URL(base_url).path.rstrip("/")
+        self.upstream = upstream
+        self.record_dir = Path(record_dir) if record_dir is not None else None
+
+    def key_for(self, request: httpx.Request) -> str:
+        path = request.url.path
+        if self.base_path and path.startswith(self.base_path):
+            path = path[len(self.base_path):]
+        return fixture_key(path, dict(request.url.params))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = self.key_for(request)
+        if self.upstream is None:
+            body = self.store.get(key)
+            if body is None:
+                return httpx.Response(404, json={
+                    "success": False, "status_code": 34, "status_message": f"No fixture for {request.url.path}",
+                })
+            return httpx.Response(200, content=body, headers={"content-type": "application/json"})
+
+        response = await self.upstream.handle_async_request(request)
+        if response.status_code != 200:
+            return response
+        body = await response.aread()
+        self.store.put(key, body)
+        if self.record_dir is not None:
+            await asyncio.to_thread(self._write, key, body)
+        return httpx.Response(200, content=body, headers={"content-type": "application/json"})
+
+    def _write(self, key: str, body: bytes):
+        self.record_dir.mkdir(parents=True, exist_ok=True)
+        (self.record_dir / f"{key}.json").write_bytes(body)
+
+    async def aclose(self):
+        if self.upstream is not None:
+            await self.upstream.aclose()
+
+
+def build_transport() -> Optional[FixtureTransport]:
+    """Транспорт по TMDB_FIXTURES / USE_TMDB_CACHE или None (обычный режим — запросы в TMDB)"""
+    mode = os.getenv("TMDB_FIXTURES", "").lower()
+    if not mode and str(os.getenv("USE_TMDB_CACHE", "")).lower() in ("1", "true", "yes"):
+        mode = "replay"
+    if not mode or mode == "off":
+        return None
+
+    directory = Path(os.getenv("TMDB_FIXTURE_DIR") or CACHE_DIR)
+    bundle = os.getenv("TMDB_FIXTURE_BUNDLE")
+    store = FixtureStore()
+    if mode == "replay":
+        if bundle:
+            store.load_bundle(Path(bundle))
+        else:
+            store.load_dir(directory)
+        return FixtureTransport(store)
+    if mode == "record":
+        # -- с собственным транспортом лимиты и http2 клиента не действуют — задаём их транспорту, как в TmdbClient
+        upstream = httpx.AsyncHTTPTransport(limits=pool_limits(), http2=use_http2())
+        return FixtureTransport(store, upstream=upstream, record_dir=directory)
+    raise ValueError(f"Unknown TMDB_FIXTURES mode: {mode}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bundle", required=True, help="куда записать бандл")
+    parser.add_argument("--dir", default=os.getenv("TMDB_FIXTURE_DIR") or str(CACHE_DIR), help="каталог фикстур")
+    args = parser.parse_args(argv)
+    store = FixtureStore()
+    count = store.load_dir(Path(args.dir))
+    store.write_bundle(Path(args.bundle))
+    print(f"{count} fixtures -> {args.bundle}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+import httpx
+
+from backend.response_cache import (
+    ENDPOINT_TTLS, FRESH, STALE, TMDB_CACHE_ENABLED, Payload, ResponseCache, make_key,
+)
+from backend.cache_backends import CacheBackend
+from backend.metrics import CACHE_LOOKUPS, TMDB_ERRORS, TMDB_LATENCY
+from backend.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
+TMDB_LANGUAGE = "ru-RU"
+
+# -- параметры пула соединений и таймаутов (можно переопределить через .env)
+TMDB_MAX_CONNECTIONS = int(os.getenv("TMDB_MAX_CONNECTIONS", "100"))
+TMDB_MAX_KEEPALIVE = int(os.getenv("TMDB_MAX_KEEPALIVE", "20"))
+TMDB_KEEPALIVE_EXPIRY = float(os.getenv("TMDB_KEEPALIVE_EXPIRY", "30"))
+TMDB_CONNECT_TIMEOUT = float(os.getenv("TMDB_CONNECT_TIMEOUT", "5"))
+TMDB_READ_TIMEOUT = float(os.getenv("TMDB_READ_TIMEOUT", "10"))
+TMDB_POOL_TIMEOUT = float(os.getenv("TMDB_POOL_TIMEOUT", "5"))
+TMDB_HTTP2 = str(os.getenv("TMDB_HTTP2", "true")).lower() in ("1", "true", "yes")
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def pool_limits() -> httpx.Limits:
+    """Лимиты пула соединений к TMDB; общие для клиента и транспорта записи фикстур (tmdb_cache)"""
+    return httpx.Limits(
+        max_connections=TMDB_MAX_CONNECTIONS,
+        max_keepalive_connections=TMDB_MAX_KEEPALIVE,
+        keepalive_expiry=TMDB_KEEPALIVE_EXPIRY,
+    )
+
+
+def use_http2() -> bool:
+    return TMDB_HTTP2 and _http2_available()
+
+
+class TmdbClient:
+    """Долгоживущий клиент TMDB с пулом keep-alive соединений (один на воркер)"""
+
+    def __init__(
+            self,
+            api_key: str,
+            base_url: str = TMDB_BASE_URL,
+            language: str = TMDB_LANGUAGE,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+            cache: Optional[ResponseCache] = None,
+            shared_cache: Optional[CacheBackend] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.language = language
+        self.transport = transport
+        if cache is None and TMDB_CACHE_ENABLED:
+            cache = ResponseCache()
+        self.cache = cache
+        self.shared_cache = shared_cache
+        self.singleflight = SingleFlight()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._refreshing = set()
+        self._background = set()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        timeout = httpx.Timeout(
+            TMDB_READ_TIMEOUT,
+            connect=TMDB_CONNECT_TIMEOUT,
+            pool=TMDB_POOL_TIMEOUT,
+        )
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=pool_limits(),
+            timeout=timeout,
+            http2=use_http2(),
+            transport=self.transport,
+        )
+
+    async def start(self):
+        """Открыть пул соединений (вызывается из lifespan приложения)"""
+        if self._client is None:
+            self._client = self._build_client()
+
+    async def aclose(self):
+        """Закрыть пул соединений и остановить фоновые обновления кэша"""
+        for task in list(self._background):
+            task.cancel()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self.shared_cache is not None:
+            await self.shared_cache.aclose()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # -- если lifespan не запускался (например, TestClient без with) — создаём лениво
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    async def _request(self, path: str, params: Optional[dict] = None, endpoint: str = "other"):
+        query = {"api_key": self.api_key, "language": self.language}
+        if params:
+            query.update(params)
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(path, params=query)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            TMDB_ERRORS.labels(endpoint, str(e.response.status_code)).inc()
+            raise
+        except httpx.HTTPError as e:
+            TMDB_ERRORS.labels(endpoint, type(e).__name__).inc()
+            raise
+        finally:
+            TMDB_LATENCY.labels(endpoint).observe(time.perf_counter() - started)
+        return Payload(response.content)
+
+    async def get_json(self, path: str, params: Optional[dict] = None, endpoint: str = "other"):
+        """GET-запрос к TMDB; ошибки HTTP пробрасываются как httpx.HTTPError"""
+        payload = await self._request(path, params, endpoint)
+        return payload.data
+
+    async def fetch(
+            self,
+            endpoint: str,
+            path: str,
+            params: Optional[dict] = None,
+            limiter: Optional[asyncio.Semaphore] = None,
+    ):
+        """То же, что fetch_payload, но ответ разобран в dict"""
+        payload = await self.fetch_payload(endpoint, path, params, limiter)
+        return payload.data
+
+    async def fetch_payload(
+            self,
+            endpoint: str,
+            path: str,
+            params: Optional[dict] = None,
+            limiter: Optional[asyncio.Semaphore] = None,
+    ) -> Payload:
+        """GET-запрос к TMDB через кэши: L1 в памяти воркера -> общий L2 -> TMDB.
+
+        В кэшах хранится тело ответа как есть (Payload), его можно отдать клиенту без повторной сериализации.
+        Устаревшие записи отдаются сразу и обновляются в фоне (stale-while-revalidate),
+        одновременные промахи по одному ключу склеиваются в один запрос.
+        limiter ограничивает параллелизм только промахов — попадания в L1 отдаются сразу.
+        """
+        key = make_key(endpoint, path, {"language": self.language, **(params or {})})
+        if self.cache is None:
+            return await self._limited(limiter, self.singleflight.do(key, lambda: self._request(path, params, endpoint)))
+
+        value, state = self.cache.get(key)
+        CACHE_LOOKUPS.labels("l1", state).inc()
+        if state == FRESH:
+            return value
+        if state == STALE:
+            self._schedule_refresh(endpoint, key, path, params)
+            return value
+        return await self._limited(limiter, self._load(endpoint, key, path, params))
+
+    async def refresh(self, endpoint: str, path: str, params: Optional[dict] = None) -> Payload:
+        """Запросить ответ из TMDB и положить в кэши, даже если запись ещё свежая (прогрев заранее)"""
+        key = make_key(endpoint, path, {"language": self.language, **(params or {})})
+        if self.cache is None:
+            return await self._request(path, params, endpoint)
+        return await self._load(endpoint, key, path, params, force=True)
+
+    @staticmethod
+    async def _limited(limiter: Optional[asyncio.Semaphore], coro):
+        if limiter is None:
+            return await coro
+        async with limiter:
+            return await coro
+
+    async def _load(
+            self,
+            endpoint: str,
+            key: str,
+            path: str,
+            params: Optional[dict],
+            refreshing: bool = False,
+            force: bool = False,
+    ):
+        async def load():
+            # -- force (прогрев): запись в L2 может быть ещё свежей, но её и нужно обновить — сразу в TMDB
+            if self.shared_cache is not None and not force:
+                entry = await self.shared_cache.get(key)
+                if entry is not None:
+                    body, expires_at, _ = entry
+                    ttl = expires_at - time.time()
+                    # -- при фоновом обновлении устаревшая запись L2 не подходит — идём в TMDB
+                    if ttl > 0 or not refreshing:
+                        payload = Payload(body)
+                        await asyncio.to_thread(payload.precompress)
+                        self.cache.set(key, payload, len(payload), ttl)
+                        if ttl <= 0:
+                            self._schedule_refresh(endpoint, key, path, params)
+                        return payload
+
+            ttl = ENDPOINT_TTLS[endpoint]
+            payload = await self._request(path, params, endpoint)
+            # -- gzip/brotli один раз на запись кэша, вне event loop
+            await asyncio.to_thread(payload.precompress)
+            self.cache.set(key, payload, len(payload), ttl)
+            if self.shared_cache is not None:
+                await self.shared_cache.set(key, payload.body, ttl, self.cache.stale_seconds)
+            return payload
+
+        return await self.singleflight.do(key, load)
+
+    def _schedule_refresh(self, endpoint: str, key: str, path: str, params: Optional[dict]):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._load(endpoint, key, path, params, refreshing=True)
+            except httpx.HTTPError as e:
+                logger.warning("TMDB background refresh failed for %s: %s", key, e)
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
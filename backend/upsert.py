@@ -0,0 +1,11 @@
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(db, model):
+    """INSERT с поддержкой ON CONFLICT для диалекта сессии (PostgreSQL или SQLite)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"ON CONFLICT is not supported for dialect {dialect}")
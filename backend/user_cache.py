@@ -0,0 +1,76 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+# -- сколько секунд снимок пользователя живёт в памяти воркера; 0 — кэш выключен
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Облегчённая копия пользователя для авторизованных запросов (без пароля и связей)"""
+
+    id: int
+    username: str
+    display_name: Optional[str]
+    email: str
+    avatar_url: Optional[str]
+
+
+class UserCache:
+    """TTL-кэш снимков пользователей в памяти воркера, ключ — (id пользователя, iat токена).
+
+    Кэш локален для процесса: update_profile сбрасывает запись только в своём воркере,
+    остальные увидят изменения не позже чем через ttl секунд.
+    """
+
+    def __init__(
+            self,
+            ttl: float = USER_CACHE_TTL,
+            max_entries: int = USER_CACHE_MAX_ENTRIES,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Tuple[int, Optional[int]], Tuple[UserSnapshot, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id: int, iat: Optional[int]) -> Optional[UserSnapshot]:
+        key = (user_id, iat)
+        entry = self._entries.get(key)
+        if entry is None or self.clock() >= entry[1]:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, iat: Optional[int], snapshot: UserSnapshot):
+        if self.ttl <= 0:
+            return
+        key = (snapshot.id, iat)
+        self._entries[key] = (snapshot, self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        """Удалить все снимки пользователя (по всем его токенам)"""
+        for key in [key for key in self._entries if key[0] == user_id]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
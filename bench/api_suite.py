@@ -0,0 +1,290 @@
+"""
+Офлайн-бенчмарк ключевых эндпоинтов API на синтетических данных заданного объёма.
+
+База (временная SQLite или Postgres через --database-url) заполняется воспроизводимо
+(--seed), запросы идут в одном процессе через ASGI-клиент httpx, TMDB подменён заглушкой bench.tmdb_stub.
+Для каждого сценария считаются p50/p95/p99 и число SQL-запросов на HTTP-запрос.
+
+    python -m bench.api_suite --users 500 --movies 50 --reviews-per-movie 100 --output bench.json
+    python -m bench.api_suite --output new.json --baseline bench.json --tolerance 0.25
+
+С --baseline процесс завершается с кодом 1, если p95 вырос больше чем на tolerance
+или сценарий стал делать больше запросов к БД.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bench.stats import percentile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="по умолчанию — временная SQLite")
+    parser.add_argument("--reset", action="store_true", help="разрешить пересоздать таблицы в --database-url")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--movies", type=int, default=50)
+    parser.add_argument("--reviews-per-movie", type=int, default=40)
+    parser.add_argument("--favorites-per-user", type=int, default=20)
+    parser.add_argument("--history-per-user", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200, help="запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tmdb-latency", default="", help="задержка заглушки TMDB, см. bench.tmdb_stub")
+    parser.add_argument("--only", action="append", help="запустить только эти сценарии")
+    parser.add_argument("--output", help="куда записать результаты (JSON)")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост p95 (доля)")
+    args = parser.parse_args(argv)
+    if args.database_url and not args.reset:
+        parser.error("--database-url drops and recreates all tables; pass --reset to confirm")
+    if args.reviews_per_movie > args.users:
+        parser.error("--reviews-per-movie cannot exceed --users (one review per user and movie)")
+    if args.favorites_per_user > args.movies or args.history_per_user > args.movies:
+        parser.error("--favorites-per-user and --history-per-user cannot exceed --movies")
+    return args
+
+
+def configure_environment(args):
+    """Переменные окружения задаются до импорта backend — движки создаются при импорте"""
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="watch-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("TMDB_API_KEY", "bench-key")
+    os.environ["TMDB_L2_CACHE"] = ""
+
+
+MOVIE_ID_BASE = 100000
+
+
+def seed(args):
+    """Заполнить базу: пользователи, отзывы на фильм, избранное и история на пользователя"""
+    from sqlalchemy import insert, select
+    from sqlalchemy.orm import Session
+
+    from backend import models, rating_stats
+    from backend.database import engine
+    from backend.passwords import get_password_hash
+
+    rng = random.Random(args.seed)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    hashed = get_password_hash("bench123")  # -- один bcrypt на всех: сидинг не должен занимать минуты
+    movie_ids = [MOVIE_ID_BASE + i for i in range(args.movies)]
+    start = datetime(2024, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"username": f"user{i}", "display_name": f"User {i}", "email": f"user{i}@bench.local",
+             "hashed_password": hashed, "created_at": start}
+            for i in range(args.users)
+        ])
+        user_ids = list(conn.scalars(select(models.User.id).order_by(models.User.id)))
+
+        reviews = []
+        for movie_id in movie_ids:
+            for user_id in rng.sample(user_ids, args.reviews_per_movie):
+                reviews.append({
+                    "user_id": user_id, "movie_id": movie_id, "rating": rng.randint(1, 10),
+                    "comment": "Synthetic review " * rng.randint(1, 8),
+                    "created_at": start + timedelta(seconds=rng.randint(0, 10 ** 7)),
+                })
+        if reviews:
+            conn.execute(insert(models.Review), reviews)
+
+        favorites, history = [], []
+        for user_id in user_ids:
+            for movie_id in rng.sample(movie_ids, args.favorites_per_user):
+                favorites.append({"user_id": user_id, "movie_id": movie_id,
+                                  "added_at": start + timedelta(seconds=rng.randint(0, 10 ** 7))})
+            for movie_id in rng.sample(movie_ids, args.history_per_user):
+                history.append({"user_id": user_id, "movie_id": movie_id,
+                                "watched_at": start + timedelta(seconds=rng.randint(0, 10 ** 7))})
+        if favorites:
+            conn.execute(insert(models.Favorite), favorites)
+        if history:
+            conn.execute(insert(models.WatchHistory), history)
+
+    with Session(engine) as session:
+        rating_stats.rebuild(session)
+    return movie_ids, user_ids
+
+
+def scenarios(movie_ids, user_ids, tokens, rng):
+    """Имя -> функция, возвращающая (метод, путь, kwargs) для очередного запроса"""
+
+    def auth(user_id):
+        return {"headers": {"Authorization": f"Bearer {tokens[user_id]}"}}
+
+    def some_user():
+        return rng.choice(list(tokens))
+
+    # -- пачка оценок — до 20 фильмов, но не больше, чем их создано (--movies)
+    batch_size = min(20, len(movie_ids))
+
+    return {
+        "movie_reviews": lambda: ("GET", f"/api/reviews/{rng.choice(movie_ids)}", {}),
+        "movie_rating": lambda: ("GET", f"/api/movies/{rng.choice(movie_ids)}/rating", {}),
+        "movie_ratings_batch": lambda: (
+            "GET", "/api/movies/ratings", {"params": {"ids": ",".join(map(str, rng.sample(movie_ids, batch_size)))}}
+        ),
+        "user_reviews": lambda: ("GET", f"/api/users/{rng.choice(user_ids)}/reviews", {}),
+        "favorites": lambda: ("GET", "/api/favorites", auth(some_user())),
+        "history": lambda: ("GET", "/api/history", auth(some_user())),
+        "history_add": lambda: ("POST", "/api/history", {"json": {"movie_id": rng.choice(movie_ids)},
+                                                          **auth(some_user())}),
+        "me": lambda: ("GET", "/api/auth/me", auth(some_user())),
+        "dashboard": lambda: ("GET", "/api/me/dashboard", auth(some_user())),
+        "movies_popular": lambda: ("GET", "/api/movies/popular", {}),
+        "movie_details": lambda: ("GET", f"/api/movies/{rng.choice(movie_ids)}", {}),
+    }
+
+
+async def run_scenario(client, make_request, total: int, concurrency: int):
+    from backend.sql_instrumentation import track_queries
+
+    # -- прогрев: кэши TMDB, пользователей и планы запросов
+    for _ in range(min(10, total)):
+        method, path, kwargs = make_request()
+        await client.request(method, path, **kwargs)
+
+    latencies, errors = [], 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, kwargs = make_request()
+            started = time.perf_counter()
+            r = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if r.status_code >= 400:
+                errors += 1
+
+    with track_queries() as queries:
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "queries_per_request": round(queries.count / len(latencies), 2) if latencies else 0.0,
+    }
+
+
+async def run_suite(args, movie_ids, user_ids):
+    import httpx
+
+    from backend import main
+    from backend.tmdb_client import TmdbClient
+    from bench.tmdb_stub import StubConfig, create_app
+
+    stub = create_app(StubConfig(latency=args.tmdb_latency, error_rate=0, timeout_rate=0, seed=args.seed))
+    main.tmdb = TmdbClient(api_key="bench-key", base_url="http://tmdb-stub/3",
+                           transport=httpx.ASGITransport(app=stub))
+    rng = random.Random(args.seed)
+    tokens = {user_id: main.create_access_token({"sub": user_id}) for user_id in user_ids[:50]}
+    selected = scenarios(movie_ids, user_ids, tokens, rng)
+    if args.only:
+        selected = {name: fn for name, fn in selected.items() if name in args.only}
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, make_request in selected.items():
+            results[name] = await run_scenario(client, make_request, args.requests, args.concurrency)
+            row = results[name]
+            print(f"{name:<20} p50 {row['p50_ms']:>8.2f}ms  p95 {row['p95_ms']:>8.2f}ms  "
+                  f"p99 {row['p99_ms']:>8.2f}ms  {row['rps']:>8.1f} req/s  "
+                  f"{row['queries_per_request']:>5} q/req  errors {row['errors']}")
+    await main.tmdb.aclose()
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Список регрессий относительно baseline: рост p95 сверх tolerance или рост числа запросов"""
+    regressions = []
+    for name, old in baseline.get("results", {}).items():
+        new = results.get(name)
+        if new is None:
+            continue
+        if new["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {old['p95_ms']:.2f}ms -> {new['p95_ms']:.2f}ms")
+        if new["queries_per_request"] > old["queries_per_request"] + 0.01:
+            regressions.append(
+                f"{name}: queries/request {old['queries_per_request']} -> {new['queries_per_request']}"
+            )
+    return regressions
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from backend.database import engine
+
+    started = time.perf_counter()
+    movie_ids, user_ids = seed(args)
+    print(f"Seeded {engine.dialect.name} in {time.perf_counter() - started:.1f}s")
+
+    results = asyncio.run(run_suite(args, movie_ids, user_ids))
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "dataset": {
+                "users": args.users, "movies": args.movies, "reviews_per_movie": args.reviews_per_movie,
+                "favorites_per_user": args.favorites_per_user, "history_per_user": args.history_per_user,
+                "seed": args.seed,
+            },
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("dataset") != report["meta"]["dataset"]:
+            print("Warning: baseline was recorded with a different dataset", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,129 @@
+"""
+Бенчмарк «шторм логинов»: пропускная способность /api/auth/login и задержки
+других эндпоинтов, пока воркер занят bcrypt.
+
+Запускается офлайн, в одном процессе (одна копия воркера, ASGI-клиент httpx):
+
+    python -m bench.login_storm --logins 200 --concurrency 32
+
+Сравниваются два режима: bcrypt прямо в event loop (PASSWORD_HASH_WORKERS=0,
+как было раньше) и bcrypt в ограниченном пуле потоков.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix="watch-bench-"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("TMDB_API_KEY", "bench-key")
+os.environ["TMDB_L2_CACHE"] = ""
+
+import httpx  # noqa: E402
+
+from backend import main, models  # noqa: E402
+from backend.database import engine  # noqa: E402
+from backend.passwords import PasswordHasher  # noqa: E402
+from backend.tmdb_client import TmdbClient  # noqa: E402
+from bench.stats import percentile  # noqa: E402
+
+PROBE_INTERVAL = 0.01
+
+
+def _tmdb_stub(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"page": 1, "results": [{"id": 1, "title": "Bench Movie"}]})
+
+
+async def run_storm(workers: int, logins: int, concurrency: int):
+    main.password_hasher = PasswordHasher(workers=workers, max_queue=max(logins, 1))
+    main.tmdb = TmdbClient(api_key="bench-key", transport=httpx.MockTransport(_tmdb_stub))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # -- прогреваем кэш TMDB, чтобы «другой» эндпоинт был дешёвым
+        await client.get("/api/movies/popular")
+
+        login_latencies = []
+        other_latencies = []
+        done = asyncio.Event()
+        queue = asyncio.Queue()
+        for _ in range(logins):
+            queue.put_nowait(None)
+
+        async def login_worker():
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                r = await client.post("/api/auth/login", json={"username": "bench", "password": "bench123"})
+                assert r.status_code == 200, r.text
+                login_latencies.append(time.perf_counter() - started)
+
+        async def other_worker():
+            # -- пробы с фиксированным шагом: задержка считается от запланированного момента,
+            # -- поэтому время, когда event loop был заблокирован, тоже попадает в замер
+            scheduled = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                r = await client.get("/api/movies/popular")
+                assert r.status_code == 200
+                other_latencies.append(time.perf_counter() - scheduled)
+                scheduled += PROBE_INTERVAL
+
+        others = [asyncio.create_task(other_worker()) for _ in range(4)]
+        started = time.perf_counter()
+        await asyncio.gather(*[login_worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*others)
+
+    main.password_hasher.shutdown()
+    return {
+        "mode": "inline" if workers <= 0 else f"pool({workers})",
+        "logins_per_sec": len(login_latencies) / elapsed,
+        "login_p50_ms": percentile(login_latencies, 50) * 1000,
+        "other_p50_ms": percentile(other_latencies, 50) * 1000,
+        "other_p99_ms": percentile(other_latencies, 99) * 1000,
+        "other_max_ms": max(other_latencies, default=0) * 1000,
+        "other_requests": len(other_latencies),
+    }
+
+
+async def setup_user():
+    models.Base.metadata.create_all(bind=engine)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/api/auth/register", json={
+            "username": "bench", "email": "bench@example.com", "password": "bench123"
+        })
+        assert r.status_code == 200, r.text
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="размер пула bcrypt для второго прогона")
+    args = parser.parse_args(argv)
+
+    asyncio.run(setup_user())
+    rows = [
+        asyncio.run(run_storm(0, args.logins, args.concurrency)),
+        asyncio.run(run_storm(args.workers, args.logins, args.concurrency)),
+    ]
+
+    header = (f"{'mode':<10} {'logins/s':>9} {'login p50':>10} {'other p50':>10} {'other p99':>10} "
+              f"{'other max':>10} {'probes':>7}")
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['mode']:<10} {row['logins_per_sec']:>9.1f} {row['login_p50_ms']:>8.1f}ms "
+              f"{row['other_p50_ms']:>8.1f}ms {row['other_p99_ms']:>8.1f}ms {row['other_max_ms']:>8.1f}ms "
+              f"{row['other_requests']:>7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
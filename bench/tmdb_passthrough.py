@@ -0,0 +1,100 @@
+"""
+Бенчмарк отдачи ответов TMDB: CPU на запрос при повторной сериализации dict и при
+отдаче тела из кэша как есть (bytes).
+
+Один и тот же TmdbClient с прогретым L1-кэшем, три варианта маршрута:
+
+    json        — dict из кэша, стандартный JSONResponse (как было раньше)
+    orjson      — dict из кэша, ORJSONResponse
+    passthrough — Payload.body в Response без разбора и сериализации
+
+    python -m bench.tmdb_passthrough --payload-kb 300 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from backend.response_cache import ResponseCache
+from backend.tmdb_client import TmdbClient
+
+
+def make_body(payload_kb: int) -> bytes:
+    """Страница в формате /movie/popular примерно заданного размера"""
+    results, size, movie_id = [], 0, 1
+    while size < payload_kb * 1024:
+        movie = {
+            "id": movie_id, "title": f"Movie {movie_id}", "original_title": f"Movie {movie_id}",
+            "overview": "Синтетическое описание фильма. " * 12, "release_date": "2020-01-01",
+            "vote_average": 7.3, "vote_count": 1234, "popularity": 98.76, "genre_ids": [28, 12, 878],
+            "poster_path": f"/p{movie_id}.jpg", "backdrop_path": f"/b{movie_id}.jpg", "adult": False,
+        }
+        results.append(movie)
+        size += len(json.dumps(movie, ensure_ascii=False).encode())
+        movie_id += 1
+    return json.dumps({"page": 1, "results": results, "total_pages": 1, "total_results": len(results)},
+                      ensure_ascii=False).encode()
+
+
+def build_app(tmdb: TmdbClient) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/json", response_class=JSONResponse)
+    async def as_json():
+        return await tmdb.fetch("popular", "/movie/popular", {"page": 1})
+
+    @app.get("/orjson", response_class=ORJSONResponse)
+    async def as_orjson():
+        return await tmdb.fetch("popular", "/movie/popular", {"page": 1})
+
+    @app.get("/passthrough")
+    async def passthrough():
+        payload = await tmdb.fetch_payload("popular", "/movie/popular", {"page": 1})
+        return Response(content=payload.body, media_type="application/json")
+
+    return app
+
+
+async def run(payload_kb: int, requests: int):
+    body = make_body(payload_kb)
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    tmdb = TmdbClient(api_key="bench-key", base_url="http://tmdb.test/3", transport=transport,
+                      cache=ResponseCache())
+    app = build_app(tmdb)
+
+    rows = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for name in ("json", "orjson", "passthrough"):
+            for _ in range(20):
+                await client.get(f"/{name}")
+            cpu, wall = time.process_time(), time.perf_counter()
+            for _ in range(requests):
+                response = await client.get(f"/{name}")
+            cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+            rows.append((name, cpu / requests, wall / requests, len(response.content)))
+    await tmdb.aclose()
+    return len(body), rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payload-kb", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    size, rows = asyncio.run(run(args.payload_kb, args.requests))
+    print(f"payload {size / 1024:.0f} KB, {args.requests} requests per variant (ASGI client overhead included)")
+    baseline = rows[0][1]
+    for name, cpu, wall, length in rows:
+        print(f"{name:<12} cpu {cpu * 1000:>8.3f} ms/req  wall {wall * 1000:>8.3f} ms/req  "
+              f"saved {(baseline - cpu) * 1000:>7.3f} ms/req  body {length} B")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
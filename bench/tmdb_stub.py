@@ -0,0 +1,219 @@
+"""
+Локальная заглушка TMDB API (ASGI) для нагрузочных тестов и бенчмарков без сети.
+
+Отдаёт записанные ответы из backend/cache/tmdb, а для остальных id и страниц —
+детерминированные синтетические документы того же формата. Маршруты:
+/3/movie/popular, /3/search/movie, /3/discover/movie, /3/movie/{id}, /3/movie/{id}/videos.
+
+Задержка, доля ошибок и «зависших» запросов настраиваются:
+
+    python -m bench.tmdb_stub --port 8001 --latency lognormal:40,0.5 --error-rate 0.01 --timeout-rate 0.001
+    TMDB_BASE_URL=http://localhost:8001/3 python run.py
+
+Формат --latency: fixed:MS, uniform:MIN_MS,MAX_MS, lognormal:MEDIAN_MS,SIGMA или пусто (без задержки).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "backend" / "cache" / "tmdb"
+
+TMDB_STUB_LATENCY = os.getenv("TMDB_STUB_LATENCY", "")
+TMDB_STUB_ERROR_RATE = float(os.getenv("TMDB_STUB_ERROR_RATE", "0"))
+TMDB_STUB_ERROR_STATUS = int(os.getenv("TMDB_STUB_ERROR_STATUS", "500"))
+TMDB_STUB_TIMEOUT_RATE = float(os.getenv("TMDB_STUB_TIMEOUT_RATE", "0"))
+TMDB_STUB_TIMEOUT_SECONDS = float(os.getenv("TMDB_STUB_TIMEOUT_SECONDS", "30"))
+TMDB_STUB_SEED = os.getenv("TMDB_STUB_SEED")
+
+PAGE_SIZE = 20
+TOTAL_PAGES = 500
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """Описание распределения задержки -> функция, возвращающая задержку в секундах"""
+    if not spec:
+        return lambda: 0.0
+    kind, _, raw = spec.partition(":")
+    try:
+        values = [float(v) for v in raw.split(",")]
+    except ValueError:
+        values = []
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal" and len(values) == 2 and values[0] > 0:
+        # -- медиана логнормального распределения = exp(mu)
+        return lambda: rng.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"Unsupported latency spec: {spec}")
+
+
+@dataclass
+class StubConfig:
+    latency: str = TMDB_STUB_LATENCY
+    error_rate: float = TMDB_STUB_ERROR_RATE
+    error_status: int = TMDB_STUB_ERROR_STATUS
+    timeout_rate: float = TMDB_STUB_TIMEOUT_RATE
+    timeout_seconds: float = TMDB_STUB_TIMEOUT_SECONDS
+    seed: Optional[int] = int(TMDB_STUB_SEED) if TMDB_STUB_SEED else None
+    fixtures_dir: Path = FIXTURES_DIR
+    stats: dict = field(default_factory=lambda: {"requests": 0, "errors": 0, "timeouts": 0})
+
+
+def _load_fixtures(directory: Path) -> dict:
+    fixtures = {}
+    if directory.is_dir():
+        for path in directory.glob("*.json"):
+            with open(path, encoding="utf-8") as f:
+                fixtures[path.stem] = json.load(f)
+    return fixtures
+
+
+def _number(seed: str, modulo: int) -> int:
+    return int(hashlib.sha256(seed.encode()).hexdigest()[:8], 16) % modulo
+
+
+def synthetic_movie(movie_id: int) -> dict:
+    """Детерминированный «фильм» в формате /movie/{id}"""
+    return {
+        "id": movie_id,
+        "title": f"Movie {movie_id}",
+        "original_title": f"Movie {movie_id}",
+        "overview": f"Synthetic overview for movie {movie_id}. " * 4,
+        "release_date": f"{1980 + _number(f'y{movie_id}', 45)}-01-01",
+        "vote_average": round(_number(f'v{movie_id}', 90) / 10 + 1, 1),
+        "vote_count": _number(f'c{movie_id}', 20000),
+        "runtime": 80 + _number(f'r{movie_id}', 100),
+        "genres": [{"id": 28, "name": "Action"}],
+        "poster_path": f"/poster{movie_id}.jpg",
+        "backdrop_path": f"/backdrop{movie_id}.jpg",
+    }
+
+
+def _list_item(movie_id: int) -> dict:
+    movie = synthetic_movie(movie_id)
+    return {key: movie[key] for key in ("id", "title", "overview", "release_date", "vote_average", "poster_path")}
+
+
+def synthetic_page(seed: str, page: int) -> dict:
+    base = 1000 + _number(seed, 100000) + (page - 1) * PAGE_SIZE
+    return {
+        "page": page,
+        "results": [_list_item(base + i) for i in range(PAGE_SIZE)],
+        "total_pages": TOTAL_PAGES,
+        "total_results": TOTAL_PAGES * PAGE_SIZE,
+    }
+
+
+def create_app(config: Optional[StubConfig] = None) -> Starlette:
+    """ASGI-приложение заглушки; можно поднять uvicorn или передать в httpx.ASGITransport"""
+    config = config or StubConfig()
+    rng = random.Random(config.seed)
+    latency = parse_latency(config.latency, rng)
+    fixtures = _load_fixtures(Path(config.fixtures_dir))
+
+    async def respond(payload: dict) -> JSONResponse:
+        config.stats["requests"] += 1
+        delay = latency()
+        roll = rng.random()
+        if roll < config.timeout_rate:
+            config.stats["timeouts"] += 1
+            await asyncio.sleep(config.timeout_seconds)
+            return JSONResponse({"success": False, "status_code": 46, "status_message": "Timed out"}, 504)
+        if delay:
+            await asyncio.sleep(delay)
+        if roll < config.timeout_rate + config.error_rate:
+            config.stats["errors"] += 1
+            return JSONResponse(
+                {"success": False, "status_code": 11, "status_message": "Internal error (stub)"},
+                config.error_status,
+            )
+        return JSONResponse(payload)
+
+    def page_of(request: Request) -> int:
+        try:
+            return max(1, int(request.query_params.get("page", "1")))
+        except ValueError:
+            return 1
+
+    async def popular(request: Request):
+        page = page_of(request)
+        return await respond(fixtures.get(f"popular_page_{page}") or synthetic_page("popular", page))
+
+    async def search(request: Request):
+        query = request.query_params.get("query", "").strip().lower()
+        page = page_of(request)
+        recorded = fixtures.get(f"search_{query}") if page == 1 else None
+        return await respond(recorded or synthetic_page(f"search:{query}", page))
+
+    async def discover(request: Request):
+        genre = request.query_params.get("with_genres", "")
+        return await respond(synthetic_page(f"genre:{genre}", page_of(request)))
+
+    async def details(request: Request):
+        movie_id = int(request.path_params["movie_id"])
+        return await respond(fixtures.get(f"movie_{movie_id}") or synthetic_movie(movie_id))
+
+    async def videos(request: Request):
+        movie_id = int(request.path_params["movie_id"])
+        return await respond({"id": movie_id, "results": [{
+            "id": f"video{movie_id}", "key": f"stub{movie_id}", "name": "Official Trailer",
+            "site": "YouTube", "type": "Trailer", "official": True,
+        }]})
+
+    async def stats(request: Request):
+        return JSONResponse(config.stats)
+
+    api = [
+        Route("/movie/popular", popular),
+        Route("/search/movie", search),
+        Route("/discover/movie", discover),
+        Route("/movie/{movie_id:int}", details),
+        Route("/movie/{movie_id:int}/videos", videos),
+    ]
+    return Starlette(routes=[Mount("/3", routes=api), Route("/__stats", stats)])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default=TMDB_STUB_LATENCY)
+    parser.add_argument("--error-rate", type=float, default=TMDB_STUB_ERROR_RATE)
+    parser.add_argument("--error-status", type=int, default=TMDB_STUB_ERROR_STATUS)
+    parser.add_argument("--timeout-rate", type=float, default=TMDB_STUB_TIMEOUT_RATE)
+    parser.add_argument("--timeout-seconds", type=float, default=TMDB_STUB_TIMEOUT_SECONDS)
+    # -- по умолчанию TMDB_STUB_SEED, как и у StubConfig: CLI и docker-compose дают одинаковые ответы
+    parser.add_argument("--seed", type=int, default=StubConfig().seed)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import uvicorn
+
+    config = StubConfig(
+        latency=args.latency, error_rate=args.error_rate, error_status=args.error_status,
+        timeout_rate=args.timeout_rate, timeout_seconds=args.timeout_seconds, seed=args.seed,
+    )
+    parse_latency(config.latency, random.Random())  # -- ошибку в описании показываем до старта сервера
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -60,7 +60,7 @@ async function checkIfFavorite(movieId) {
   if (!token) return false
 
   try {
-    const response = await fetch(`${API_BASE_URL}/favorites`, {
+    const response = await fetch(`${API_BASE_URL}/favorites?movie_id=${Number.parseInt(movieId)}`, {
       headers: {
         Authorization: `Bearer ${token}`,
       },
@@ -69,7 +69,7 @@ async function checkIfFavorite(movieId) {
     if (!response.ok) return false
 
     const favorites = await response.json()
-    return favorites.some((fav) => fav.movie_id === Number.parseInt(movieId))
+    return favorites.items.length > 0
   } catch (error) {
     console.error("Error checking favorites:", error)
     return false
@@ -317,37 +317,65 @@ document.addEventListener("DOMContentLoaded", async () => {
   })
 })
 
-async function loadReviews(movieId) {
+async function loadReviews(movieId, cursor = null) {
   const reviewsList = document.getElementById("reviewsList")
 
   try {
-    const response = await fetch(`${API_BASE_URL}/reviews/${movieId}`)
+    const params = new URLSearchParams()
+    if (cursor) params.set("cursor", cursor)
+    const response = await fetch(`${API_BASE_URL}/reviews/${movieId}?${params}`)
 
     if (!response.ok) {
       throw new Error("Failed to load reviews")
     }
 
-    const reviews = await response.json()
+    const page = await response.json()
+    const reviews = page.items
 
-    if (reviews.length === 0) {
+    const loadMoreBtn = document.getElementById("loadMoreReviews")
+    if (loadMoreBtn) loadMoreBtn.remove()
+
+    if (!cursor && reviews.length === 0) {
       reviewsList.innerHTML = '<p class="no-reviews">Пока нет отзывов. Будьте первым!</p>'
       return
     }
 
-    reviewsList.innerHTML = reviews
-      .map((review) => {
-        const reviewDate = new Date(review.created_at)
-        const formattedDate = reviewDate.toLocaleDateString("ru-RU", {
-          year: "numeric",
-          month: "long",
-          day: "numeric",
-        })
+    const html = reviews.map(renderReview).join("")
+    if (cursor) {
+      reviewsList.insertAdjacentHTML("beforeend", html)
+    } else {
+      reviewsList.innerHTML = html
+    }
+
+    // Next page is loaded on demand with the opaque cursor from the server
+    if (page.next_cursor) {
+      reviewsList.insertAdjacentHTML(
+        "beforeend",
+        '<button id="loadMoreReviews" class="btn-secondary load-more-btn">Показать ещё</button>',
+      )
+      document.getElementById("loadMoreReviews").addEventListener("click", () => {
+        loadReviews(movieId, page.next_cursor)
+      })
+    }
+  } catch (error) {
+    console.error("Error loading reviews:", error)
+    reviewsList.innerHTML = '<p class="error-message">Ошибка загрузки отзывов</p>'
+  }
+}
+
+function renderReview(review) {
+  const reviewDate = new Date(review.created_at)
+  const formattedDate = reviewDate.toLocaleDateString("ru-RU", {
+    year: "numeric",
+    month: "long",
+    day: "numeric",
+  })
 
-        // XSS protection - escape HTML
-        const safeComment = escapeHtml(review.comment)
-        const safeUsername = escapeHtml(review.user.username)
+  // XSS protection - escape HTML
+  const safeComment = escapeHtml(review.comment)
+  const safeUsername = escapeHtml(review.user.username)
 
-        return `
+  return `
         <div class="review-item">
             <div class="review-header">
                 <div class="review-author">
@@ -371,12 +399,6 @@ async function loadReviews(movieId) {
             <p class="review-text">${safeComment}</p>
         </div>
     `
-      })
-      .join("")
-  } catch (error) {
-    console.error("Error loading reviews:", error)
-    reviewsList.innerHTML = '<p class="error-message">Ошибка загрузки отзывов</p>'
-  }
 }
 
 // XSS protection function
@@ -1,5 +1,7 @@
 const API_BASE_URL = "http://localhost:8000/api"
 
+let currentUser = null
+
 document.addEventListener("DOMContentLoaded", async () => {
   const token = localStorage.getItem("token")
 
@@ -10,8 +12,8 @@ document.addEventListener("DOMContentLoaded", async () => {
   }
 
   try {
-    // Load user profile
-    const response = await fetch(`${API_BASE_URL}/auth/me`, {
+    // Load profile, favorites, history and reviews in one round trip
+    const response = await fetch(`${API_BASE_URL}/me/dashboard`, {
       headers: {
         Authorization: `Bearer ${token}`,
       },
@@ -21,7 +23,9 @@ document.addEventListener("DOMContentLoaded", async () => {
       throw new Error("Authentication failed")
     }
 
-    const user = await response.json()
+    const dashboard = await response.json()
+    const user = dashboard.user
+    currentUser = user
 
     // Update profile UI
     document.getElementById("profileName").textContent = user.display_name || user.username
@@ -33,14 +37,14 @@ document.addEventListener("DOMContentLoaded", async () => {
       document.getElementById("defaultAvatar").style.display = "none"
     }
 
-    // Load favorites
-    await loadFavorites(token)
-
-    // Load watch history
-    await loadWatchHistory(token)
+    renderFavorites(dashboard.favorites.items)
+    renderWatchHistory(dashboard.history.items)
+    renderUserReviews(dashboard.reviews.items)
 
-    // Load user reviews
-    await loadUserReviews(token, user.id)
+    // Dashboard returns only the first page of each section, the rest is loaded on demand
+    setupLoadMore("favoritesList", dashboard.favorites.next_cursor, loadMoreFavorites)
+    setupLoadMore("historyList", dashboard.history.next_cursor, loadMoreHistory)
+    setupLoadMore("userReviews", dashboard.reviews.next_cursor, loadMoreReviews)
   } catch (error) {
     console.error("Error loading profile:", error)
     localStorage.removeItem("token")
@@ -49,28 +53,18 @@ document.addEventListener("DOMContentLoaded", async () => {
   }
 })
 
-async function loadFavorites(token) {
+function renderFavorites(favorites, append = false) {
   try {
-    const response = await fetch(`${API_BASE_URL}/favorites`, {
-      headers: {
-        Authorization: `Bearer ${token}`,
-      },
-    })
-
-    if (!response.ok) throw new Error("Failed to load favorites")
-
-    const favorites = await response.json()
     const favoritesList = document.getElementById("favoritesList")
 
-    if (favorites.length === 0) {
+    if (!append && favorites.length === 0) {
       favoritesList.innerHTML = '<p class="empty-message">У вас пока нет избранных фильмов</p>'
       return
     }
 
-    const moviesPromises = favorites.map((fav) => fetch(`${API_BASE_URL}/movies/${fav.movie_id}`).then((r) => r.json()))
-    const movies = await Promise.all(moviesPromises)
+    const movies = favorites.map((fav) => fav.movie).filter(Boolean)
 
-    favoritesList.innerHTML = movies
+    const html = movies
       .map(
         (movie) => `
         <a href="movie-detail.html?id=${movie.id}" class="movie-card">
@@ -84,34 +78,29 @@ async function loadFavorites(token) {
     `,
       )
       .join("")
+    if (append) {
+      favoritesList.insertAdjacentHTML("beforeend", html)
+    } else {
+      favoritesList.innerHTML = html
+    }
   } catch (error) {
     console.error("Error loading favorites:", error)
     document.getElementById("favoritesList").innerHTML = '<p class="error-message">Ошибка загрузки избранного</p>'
   }
 }
 
-async function loadWatchHistory(token) {
+function renderWatchHistory(history, append = false) {
   try {
-    const response = await fetch(`${API_BASE_URL}/history`, {
-      headers: {
-        Authorization: `Bearer ${token}`,
-      },
-    })
-
-    if (!response.ok) throw new Error("Failed to load watch history")
-
-    const history = await response.json()
     const historyList = document.getElementById("historyList")
 
-    if (history.length === 0) {
+    if (!append && history.length === 0) {
       historyList.innerHTML = '<p class="empty-message">История посещений пуста</p>'
       return
     }
 
-    const moviesPromises = history.map((item) => fetch(`${API_BASE_URL}/movies/${item.movie_id}`).then((r) => r.json()))
-    const movies = await Promise.all(moviesPromises)
+    const movies = history.map((item) => item.movie).filter(Boolean)
 
-    historyList.innerHTML = movies
+    const html = movies
       .map((movie) => {
         const year = movie.release_date ? movie.release_date.split("-")[0] : "N/A"
         return `
@@ -126,36 +115,29 @@ async function loadWatchHistory(token) {
     `
       })
       .join("")
+    if (append) {
+      historyList.insertAdjacentHTML("beforeend", html)
+    } else {
+      historyList.innerHTML = html
+    }
   } catch (error) {
     console.error("Error loading watch history:", error)
     document.getElementById("historyList").innerHTML = '<p class="error-message">Ошибка загрузки истории</p>'
   }
 }
 
-async function loadUserReviews(token, userId) {
+function renderUserReviews(reviews, append = false) {
   try {
-    const response = await fetch(`${API_BASE_URL}/users/${userId}/reviews`, {
-      headers: {
-        Authorization: `Bearer ${token}`,
-      },
-    })
-
-    if (!response.ok) throw new Error("Failed to load reviews")
-
-    const reviews = await response.json()
     const userReviews = document.getElementById("userReviews")
 
-    if (reviews.length === 0) {
+    if (!append && reviews.length === 0) {
       userReviews.innerHTML = '<p class="empty-message">Вы еще не оставили ни одного отзыва</p>'
       return
     }
 
-    const moviesPromises = reviews.map((review) =>
-      fetch(`${API_BASE_URL}/movies/${review.movie_id}`).then((r) => r.json()),
-    )
-    const movies = await Promise.all(moviesPromises)
+    const movies = reviews.map((review) => review.movie)
 
-    userReviews.innerHTML = reviews
+    const html = reviews
       .map((review, index) => {
         const reviewDate = new Date(review.created_at)
         const formattedDate = reviewDate.toLocaleDateString("ru-RU", {
@@ -169,7 +151,7 @@ async function loadUserReviews(token, userId) {
             <div class="review-header">
                 <div class="review-author">
                     <h4 class="movie-title-in-review">
-                        <a href="movie-detail.html?id=${review.movie_id}">${movies[index].title}</a>
+                        <a href="movie-detail.html?id=${review.movie_id}">${movies[index] ? movies[index].title : "Фильм"}</a>
                     </h4>
                     <p class="review-date">${formattedDate}</p>
                 </div>
@@ -189,12 +171,94 @@ async function loadUserReviews(token, userId) {
     `
       })
       .join("")
+    if (append) {
+      userReviews.insertAdjacentHTML("beforeend", html)
+    } else {
+      userReviews.innerHTML = html
+    }
   } catch (error) {
     console.error("Error loading user reviews:", error)
     document.getElementById("userReviews").innerHTML = '<p class="error-message">Ошибка загрузки отзывов</p>'
   }
 }
 
+function setupLoadMore(listId, cursor, loadPage) {
+  const buttonId = `${listId}LoadMore`
+  const oldButton = document.getElementById(buttonId)
+  if (oldButton) oldButton.remove()
+  if (!cursor) return
+
+  // The button goes after the list so it does not become a grid cell
+  document
+    .getElementById(listId)
+    .insertAdjacentHTML(
+      "afterend",
+      `<button id="${buttonId}" class="btn-secondary load-more-btn">Показать ещё</button>`,
+    )
+  const button = document.getElementById(buttonId)
+  button.addEventListener("click", async () => {
+    button.disabled = true
+    try {
+      const page = await loadPage(cursor)
+      setupLoadMore(listId, page.next_cursor, loadPage)
+    } catch (error) {
+      console.error(`Error loading more items for ${listId}:`, error)
+      button.disabled = false
+    }
+  })
+}
+
+async function fetchPage(path, cursor) {
+  const params = new URLSearchParams({ cursor })
+  const response = await fetch(`${API_BASE_URL}${path}?${params}`, {
+    headers: {
+      Authorization: `Bearer ${localStorage.getItem("token")}`,
+    },
+  })
+
+  if (!response.ok) {
+    throw new Error(`Failed to load ${path}`)
+  }
+
+  return response.json()
+}
+
+// Per-section endpoints return only movie ids, cards are resolved in one batch request
+async function attachMovies(items) {
+  const ids = [...new Set(items.map((item) => item.movie_id))]
+  if (ids.length === 0) return items
+
+  const response = await fetch(`${API_BASE_URL}/movies/batch?ids=${ids.join(",")}`)
+  const batch = response.ok ? await response.json() : { results: [] }
+  const movies = new Map(batch.results.map((result) => [result.id, toSummary(result.movie)]))
+  return items.map((item) => ({ ...item, movie: movies.get(item.movie_id) || null }))
+}
+
+// Same fields as the dashboard's movie summary, so later pages render like the first one
+function toSummary(movie) {
+  if (!movie) return null
+  const { id, title, poster_path, vote_average, release_date, genres } = movie
+  return { id, title, poster_path, vote_average, release_date, genres: genres || [] }
+}
+
+async function loadMoreFavorites(cursor) {
+  const page = await fetchPage("/favorites", cursor)
+  renderFavorites(await attachMovies(page.items), true)
+  return page
+}
+
+async function loadMoreHistory(cursor) {
+  const page = await fetchPage("/history", cursor)
+  renderWatchHistory(await attachMovies(page.items), true)
+  return page
+}
+
+async function loadMoreReviews(cursor) {
+  const page = await fetchPage(`/users/${currentUser.id}/reviews`, cursor)
+  renderUserReviews(await attachMovies(page.items), true)
+  return page
+}
+
 async function deleteReview(reviewId) {
   if (!confirm("Вы уверены, что хотите удалить этот отзыв?")) {
     return
@@ -1,7 +1,21 @@
-import uvicorn
-import backend.init_db
+import os
+import shutil
+import tempfile
+
+# -- воркеры делят общий L2-кэш ответов TMDB (SQLite WAL во временном каталоге)
+os.environ.setdefault("TMDB_L2_CACHE", "sqlite://")
+# -- прогрев популярного в одном из воркеров (файловая блокировка), остальные читают его из L2
+os.environ.setdefault("CACHE_WARMER_ENABLED", "true")
+# -- метрики Prometheus всех воркеров собираются через общий каталог; задаётся до импорта backend
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "watch_prometheus"))
+
+import uvicorn  # noqa: E402
+import backend.init_db  # noqa: E402, F401
 
 if __name__ == "__main__":
+    # -- файлы метрик прошлого запуска не должны попасть в новые счётчики
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
     uvicorn.run(
         "backend.main:app",
         host="0.0.0.0",